@@ -1,18 +1,22 @@
 #class_filter.py
-from typing import List, Dict
+from typing import List, Dict, Optional, Set, Tuple
+import ahocorasick
+from cachetools import LRUCache
 import httpx
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import re
 import logging
 import os
+from urllib.parse import urlsplit
 from huggingface_hub import InferenceClient
 from dotenv import load_dotenv
-import json
-import time
-import random
+import orjson
+from functions import USER_AGENT, get_api_semaphore
 from models import JobResult, JobSearchRequest
-from rate_limiter import RateLimiter
+from rate_limiter import RATE_LIMITER, TokenBucket, run_single_flight
 
 load_dotenv()
 
@@ -20,6 +24,103 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Maximum number of bytes read from a scraped job page
+MAX_PAGE_BYTES = 512_000
+# Maximum length of a scraped description kept on the job; the prompt only uses
+# a short excerpt and skill matching is well covered by the first 2KB
+MAX_DESCRIPTION_CHARS = 2000
+# Length of the description excerpt sent to the ML model (prompt tokens are the main cost)
+PROMPT_DESCRIPTION_CHARS = 200
+
+# Patterns for pulling the score out of the ML model response
+_SCORE_FIELD_RE = re.compile(r'"score"\s*:\s*(\d+(?:\.\d+)?)(?![\w.])')
+_SCORE_RE = re.compile(r"(\d+\.\d+)")
+
+# Strainers that limit parsing to the description element of each job page
+# (the class regex also matches when LinkedIn adds modifier classes to the div)
+LINKEDIN_DESCRIPTION_STRAINER = SoupStrainer("div", attrs={"class": re.compile(r"(?:^|\s)description__text(?:\s|$)")})
+INDEED_DESCRIPTION_STRAINER = SoupStrainer("div", attrs={"id": "jobDescriptionText"})
+
+def _parse_description(html: str, strainer: SoupStrainer) -> str:
+    """
+    Parse job page HTML and return the text of the description element.
+    CPU-bound, so callers run it in a worker thread.
+    
+    Args:
+        html: Raw HTML of the job posting page
+        strainer: SoupStrainer matching the description element
+        
+    Returns:
+        Job description text (truncated to MAX_DESCRIPTION_CHARS) or empty string if the element is missing
+    """
+    # lxml is much faster than html.parser, and parse_only skips building the rest of the tree
+    soup = BeautifulSoup(html, "lxml", parse_only=strainer)
+    # The strained tree only holds description divs, so the first div is the one we want
+    description_div = soup.find("div")
+    
+    if description_div:
+        return description_div.text.strip()[:MAX_DESCRIPTION_CHARS]
+    return ""
+
+def _parse_user_skills(skills: Optional[str]) -> Tuple[str, ...]:
+    """Split a comma-separated skills string into normalized lowercase skills, dropping blanks"""
+    if not skills:
+        return ()
+    return tuple(skill.strip() for skill in skills.lower().split(',') if skill.strip())
+
+def _build_skill_automaton(user_skills: Tuple[str, ...]) -> Optional[ahocorasick.Automaton]:
+    """
+    Build an Aho-Corasick automaton over the user's skills and the words of
+    multi-word skills, so a text can be scanned for all of them in one pass.
+    
+    Args:
+        user_skills: Normalized skills from _parse_user_skills
+        
+    Returns:
+        Automaton whose values are the matched lowercase terms, or None if there are no skills
+    """
+    if not user_skills:
+        return None
+    
+    automaton = ahocorasick.Automaton()
+    for skill in user_skills:
+        automaton.add_word(skill, skill)
+        # Individual words are needed for partial matches on multi-word skills
+        for word in skill.split():
+            automaton.add_word(word, word)
+    automaton.make_automaton()
+    return automaton
+
+def _find_skill_terms(automaton: Optional[ahocorasick.Automaton], text_lower: str) -> Set[str]:
+    """Return every skill term from the automaton that occurs in the lowercase text"""
+    if automaton is None:
+        return set()
+    return {term for _, term in automaton.iter(text_lower)}
+
+def _match_skills(user_skills: Tuple[str, ...], found_terms: Set[str]) -> Dict[str, float]:
+    """Map each user skill found among the scanned terms to a confidence score"""
+    if not found_terms:
+        return {}
+    
+    matched_skills = {}
+    for skill in user_skills:
+        # Exact match gets highest confidence
+        if skill in found_terms:
+            matched_skills[skill] = 1.0
+            continue
+            
+        # For multi-word skills, calculate partial matches
+        words = skill.split()
+        if len(words) > 1:
+            matched_words = sum(1 for word in words if word in found_terms)
+            if matched_words > 0:
+                confidence = matched_words / len(words)
+                # Only include if more than half the words match
+                if confidence > 0.5:
+                    matched_skills[skill] = confidence
+    
+    return matched_skills
+
 class JobRelevanceFilter:
     """
     Class responsible for filtering and scoring jobs based on relevance to user criteria.
@@ -31,6 +132,10 @@ class JobRelevanceFilter:
         if not api_key:
             raise ValueError("Hugging Face API key not found. Set the HUGGINGFACE_API_KEY environment variable.")
         self.client = InferenceClient(token=api_key)
+        # Dedicated long-lived worker threads for the synchronous Hugging Face client.
+        # The client keeps one HTTP session per thread, so reusing the same few
+        # threads keeps those sessions warm between calls.
+        self._hf_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="huggingface")
         
         # Get JSearch API key for fetching detailed job information
         self.jsearch_api_key = os.environ.get("JSEARCH_API_KEY")
@@ -38,13 +143,41 @@ class JobRelevanceFilter:
             logger.warning("JSearch API key not found. Set the JSEARCH_API_KEY environment variable for API integration.")
         
         # Cache to store job scores to avoid redundant API calls
-        self.score_cache = {}  
-        # Rate limiting variables to prevent API throttling
-        self.last_api_call = 0  
-        self.min_delay = 1.0  # Minimum time between API calls in seconds
-        
-        # Initialize rate limiter for API calls
-        self.rate_limiter = RateLimiter()
+        # (bounded LRU so a long-running server doesn't grow it forever)
+        self.score_cache = LRUCache(maxsize=10_000)
+        # Skill automata keyed by normalized skills, reused across requests with the same skills
+        self._skill_automata = LRUCache(maxsize=256)
+        
+        # Scores currently being computed, so concurrent callers share one ML call
+        self._inflight_scores: Dict[Tuple[str, str, str], asyncio.Future] = {}
+        
+        # Token bucket to prevent API throttling: bursts of up to 5 calls,
+        # refilled at 1 call per second
+        self._scoring_bucket = TokenBucket(capacity=5, refill_rate=1.0)
+        # Per-host token buckets for polite scraping of job pages
+        self._host_buckets: Dict[str, TokenBucket] = {}
+        # Bounds how many descriptions are fetched at the same time,
+        # shared across concurrent requests using this filter
+        self._fetch_sem = asyncio.Semaphore(3)
+        
+        # Shared rate limiter, so these calls count against the same API budgets as the scrapers
+        self.rate_limiter = RATE_LIMITER
+        
+        # Shared HTTP client so every fetch reuses pooled keep-alive connections
+        self._http = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            headers={"User-Agent": USER_AGENT}
+        )
+    
+    async def aclose(self):
+        """
+        Close the shared HTTP client and release its pooled connections,
+        and stop the Hugging Face worker threads.
+        """
+        await self._http.aclose()
+        self._hf_executor.shutdown(wait=False)
 
     async def fetch_job_descriptions(self, jobs: List[JobResult]) -> List[JobResult]:
         """
@@ -56,49 +189,86 @@ class JobRelevanceFilter:
         Returns:
             List of JobResult objects with descriptions added where possible
         """
-        jobs_with_descriptions = []
         # Limit the number of descriptions to fetch to avoid excessive API calls
         MAX_DESCRIPTION_FETCHES = 6
-        description_count = 0
         
+        jobs_to_fetch = []
         for job in jobs:
             # Skip fetching if job already has a description
             if job.description:
-                jobs_with_descriptions.append(job)
                 continue
             
             # If we've reached the maximum number of fetches, use job title as description
-            if description_count >= MAX_DESCRIPTION_FETCHES:
+            if len(jobs_to_fetch) >= MAX_DESCRIPTION_FETCHES:
                 job.description = f"{job.job_title} at {job.company}"
-                jobs_with_descriptions.append(job)
                 continue
-                
-            try:
-                # Try fetching from JSearch API if job_id is available
-                if job.job_id and self.jsearch_api_key:
-                    description = await self._fetch_jsearch_api_description(job.job_id)
-                    job.description = description
-                    description_count += 1
-                # Otherwise try to fetch from LinkedIn or Indeed based on source
-                elif job.source == "LinkedIn" and job.apply_link:
-                    description = await self._fetch_linkedin_description(job.apply_link)
-                    job.description = description
-                    description_count += 1
-                elif job.source == "Indeed" and job.apply_link:
-                    description = await self._fetch_indeed_description(job.apply_link)
-                    job.description = description
-                    description_count += 1
-                
-                # Add random delay to avoid detection by websites
-                await asyncio.sleep(random.uniform(0.5, 1.5))
-            except Exception as e:
-                logger.error(f"Error fetching description for {job.job_title}: {str(e)}")
-                # Use job title as fallback if description fetch fails
-                job.description = f"{job.job_title} at {job.company}"
-                
-            jobs_with_descriptions.append(job)
             
-        return jobs_with_descriptions
+            # Only queue jobs that have a source we know how to fetch from
+            if (job.job_id and self.jsearch_api_key) or (job.source in ("LinkedIn", "Indeed") and job.apply_link):
+                jobs_to_fetch.append(job)
+        
+        async def fetch_with_limit(job: JobResult) -> JobResult:
+            async with self._fetch_sem:
+                return await self._fetch_one(job)
+        
+        # Fetch descriptions concurrently, bounded by the semaphore
+        await asyncio.gather(*[fetch_with_limit(job) for job in jobs_to_fetch], return_exceptions=True)
+        
+        return list(jobs)
+    
+    async def _fetch_one(self, job: JobResult) -> JobResult:
+        """
+        Fetch the description for a single job from the best available source.
+        
+        Args:
+            job: JobResult object that needs a description
+            
+        Returns:
+            The same JobResult object with its description filled in
+        """
+        try:
+            # Try fetching from JSearch API if job_id is available
+            if job.job_id and self.jsearch_api_key:
+                job.description = await self._fetch_jsearch_api_description(job.job_id)
+            # Otherwise try to fetch from LinkedIn or Indeed based on source
+            elif job.source == "LinkedIn" and job.apply_link:
+                job.description = await self._fetch_linkedin_description(job.apply_link)
+            elif job.source == "Indeed" and job.apply_link:
+                job.description = await self._fetch_indeed_description(job.apply_link)
+        except Exception as e:
+            logger.error(f"Error fetching description for {job.job_title}: {str(e)}")
+            # Use job title as fallback if description fetch fails
+            job.description = f"{job.job_title} at {job.company}"
+        
+        return job
+    
+    async def _fetch_page_html(self, url: str) -> str:
+        """
+        Fetch a job posting page, reading at most MAX_PAGE_BYTES of the body.
+        The description appears early in the page, so the rest is never downloaded or decoded.
+        
+        Args:
+            url: Job posting URL
+            
+        Returns:
+            Decoded page HTML or empty string if the request fails
+        """
+        # Respect per-host politeness limits before scraping
+        await self._wait_for_host(url)
+        
+        async with self._http.stream("GET", url) as response:
+            if response.status_code != 200:
+                return ""
+            
+            chunks = []
+            total = 0
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+                total += len(chunk)
+                if total >= MAX_PAGE_BYTES:
+                    break
+            
+            return b"".join(chunks).decode(response.charset_encoding or "utf-8", "replace")
     
     async def _fetch_linkedin_description(self, url: str) -> str:
         """
@@ -111,34 +281,39 @@ class JobRelevanceFilter:
             Job description text or empty string if fetch fails
         """
         try:
-            async with httpx.AsyncClient(follow_redirects=True) as client:
-                # Use realistic user agent to avoid getting blocked
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-                }
-                response = await client.get(url, headers=headers, timeout=30.0)
-                
-                if response.status_code != 200:
-                    return ""
-                    
-                # Parse HTML using BeautifulSoup
-                soup = BeautifulSoup(response.text, "html.parser")
-                description_div = soup.select_one("div.description__text")
-                
-                if description_div:
-                    return description_div.text.strip()
+            html = await self._fetch_page_html(url)
+            if not html:
                 return ""
+                
+            # Parse HTML off the event loop so other fetches keep running
+            return await asyncio.to_thread(_parse_description, html, LINKEDIN_DESCRIPTION_STRAINER)
         except Exception as e:
             logger.error(f"Error fetching LinkedIn description: {str(e)}")
             return ""
 
-    def extract_skills_from_description(self, description: str, user_skills: List[str]) -> Dict[str, float]:
+    def _get_skill_automaton(self, user_skills: Tuple[str, ...]) -> Optional[ahocorasick.Automaton]:
+        """
+        Get the skill automaton for a set of normalized skills, building it only
+        the first time those skills are seen.
+        
+        Args:
+            user_skills: Normalized skills from _parse_user_skills
+            
+        Returns:
+            Cached or newly built automaton, or None if there are no skills
+        """
+        if user_skills not in self._skill_automata:
+            self._skill_automata[user_skills] = _build_skill_automaton(user_skills)
+        return self._skill_automata[user_skills]
+    
+    def extract_skills_from_description(self, description: str, user_skills: Tuple[str, ...], automaton: Optional[ahocorasick.Automaton] = None) -> Dict[str, float]:
         """
         Extract and match user skills from job description.
         
         Args:
             description: Job description text
-            user_skills: List of user's skills
+            user_skills: Normalized lowercase skills from _parse_user_skills
+            automaton: Skill automaton from _get_skill_automaton (looked up on demand if omitted)
             
         Returns:
             Dictionary of matched skills with confidence scores
@@ -146,30 +321,12 @@ class JobRelevanceFilter:
         if not description or not user_skills:
             return {}
         
-        matched_skills = {}
-        description_lower = description.lower()
+        if automaton is None:
+            automaton = self._get_skill_automaton(user_skills)
         
-        for skill in user_skills:
-            skill_lower = skill.lower().strip()
-            if not skill_lower:
-                continue
-                
-            # Exact match gets highest confidence
-            if skill_lower in description_lower:
-                matched_skills[skill] = 1.0
-                continue
-                
-            # For multi-word skills, calculate partial matches
-            words = skill_lower.split()
-            if len(words) > 1:
-                matched_words = sum(1 for word in words if word in description_lower)
-                if matched_words > 0:
-                    confidence = matched_words / len(words)
-                    # Only include if more than half the words match
-                    if confidence > 0.5:
-                        matched_skills[skill] = confidence
-        
-        return matched_skills
+        # Scan the description once for every skill and skill word
+        found_terms = _find_skill_terms(automaton, description.lower())
+        return _match_skills(user_skills, found_terms)
 
     async def _fetch_jsearch_api_description(self, job_id: str) -> str:
         """
@@ -194,23 +351,23 @@ class JobRelevanceFilter:
             }
             
             async def make_jsearch_request():
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(url, headers=headers, params=querystring, timeout=30.0)
-                    
-                    if response.status_code != 200:
-                        logger.error(f"JSearch API returned status code {response.status_code}")
-                        if response.status_code == 429:
-                            raise httpx.HTTPStatusError(f"Rate limit exceeded: {response.status_code}", request=response.request, response=response)
-                        return ""
-                    
-                    data = response.json()
-                    
-                    if "data" in data and data["data"]:
-                        job_data = data["data"][0]
-                        description = job_data.get("job_description", "")
-                        return description
-                    
+                async with get_api_semaphore("jsearch"):
+                    response = await self._http.get(url, headers=headers, params=querystring)
+                
+                if response.status_code != 200:
+                    logger.error(f"JSearch API returned status code {response.status_code}")
+                    if response.status_code == 429:
+                        raise httpx.HTTPStatusError(f"Rate limit exceeded: {response.status_code}", request=response.request, response=response)
                     return ""
+                
+                data = orjson.loads(response.content)
+                
+                if "data" in data and data["data"]:
+                    job_data = data["data"][0]
+                    description = job_data.get("job_description", "")
+                    return description
+                
+                return ""
             
             # Use rate limiter to handle retries on failure
             return await self.rate_limiter.execute_with_retry("jsearch", make_jsearch_request)
@@ -230,23 +387,12 @@ class JobRelevanceFilter:
             Job description text or empty string if fetch fails
         """
         try:
-            async with httpx.AsyncClient(follow_redirects=True) as client:
-                # Use realistic user agent to avoid getting blocked
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-                }
-                response = await client.get(url, headers=headers, timeout=30.0)
-                
-                if response.status_code != 200:
-                    return ""
-                    
-                # Parse HTML using BeautifulSoup
-                soup = BeautifulSoup(response.text, "html.parser")
-                description_div = soup.select_one("div#jobDescriptionText")
-                
-                if description_div:
-                    return description_div.text.strip()
+            html = await self._fetch_page_html(url)
+            if not html:
                 return ""
+                
+            # Parse HTML off the event loop so other fetches keep running
+            return await asyncio.to_thread(_parse_description, html, INDEED_DESCRIPTION_STRAINER)
         except Exception as e:
             logger.error(f"Error fetching Indeed description: {str(e)}")
             return ""    
@@ -265,66 +411,89 @@ class JobRelevanceFilter:
         if not jobs:
             return []
         
-        # Extract user skills from comma-separated string
-        user_skills = []
-        if criteria.skills:
-            user_skills = [skill.strip() for skill in criteria.skills.lower().split(',')]
+        # Normalize user skills and get the skill matcher once per request
+        user_skills = _parse_user_skills(criteria.skills)
+        skill_automaton = self._get_skill_automaton(user_skills)
         
-        # Pre-filter jobs to prioritize most promising candidates
-        prioritized_jobs = self._prefilter_jobs(jobs, criteria)
+        # Pre-filter jobs to prioritize most promising candidates. The prefilter
+        # scans each description once and hands back the skill terms it found,
+        # so the skills boost below doesn't scan the descriptions again.
+        prioritized_jobs = self._prefilter_jobs(jobs, criteria, user_skills, skill_automaton)
         
         # Limit number of jobs to score with ML model to manage API usage
         MAX_JOBS_TO_SCORE = 6
         jobs_to_score = prioritized_jobs[:MAX_JOBS_TO_SCORE]
         remaining_jobs = prioritized_jobs[MAX_JOBS_TO_SCORE:]
         
-        scored_jobs = []
-        # Score most promising jobs with ML model
-        for job in jobs_to_score:
+        # Preliminary scores at or beyond these thresholds are decisive enough to skip the ML model
+        HIGH_PREFILTER_SCORE = 8
+        LOW_PREFILTER_SCORE = 1
+        
+        # Use cached scores where available, decide clear-cut jobs heuristically,
+        # and collect the rest for the ML model
+        decided_jobs = []
+        uncached_jobs = []
+        for job, prefilter_score, found_terms in jobs_to_score:
+            # Check cache first to avoid redundant API calls
+            cache_key = (job.job_title, job.company, criteria.position)
+            
+            if cache_key in self.score_cache:
+                job.relevance_score = self.score_cache[cache_key]
+            elif prefilter_score >= HIGH_PREFILTER_SCORE:
+                decided_jobs.append((job, found_terms, 0.9))
+            elif prefilter_score <= LOW_PREFILTER_SCORE:
+                decided_jobs.append((job, found_terms, 0.2))
+            else:
+                uncached_jobs.append((job, found_terms))
+        
+        model_scores = []
+        if uncached_jobs:
+            # Respect rate limits once for the whole batch
+            await self._respect_rate_limit()
+            
+            # Score all uncached jobs concurrently so the ML calls overlap
+            prompts = [self._create_scoring_prompt(job, criteria) for job, _ in uncached_jobs]
+            model_scores = await asyncio.gather(*[
+                self._get_shared_job_score((job.job_title, job.company, criteria.position), prompt)
+                for (job, _), prompt in zip(uncached_jobs, prompts)
+            ], return_exceptions=True)
+        
+        model_scored_jobs = [(job, found_terms, score) for (job, found_terms), score in zip(uncached_jobs, model_scores)]
+        for job, found_terms, base_score in decided_jobs + model_scored_jobs:
             try:
-                # Check cache first to avoid redundant API calls
-                cache_key = f"{job.job_title}_{job.company}_{criteria.position}"
+                if isinstance(base_score, Exception):
+                    raise base_score
                 
-                if cache_key in self.score_cache:
-                    job.relevance_score = self.score_cache[cache_key]
-                else:
-                    # Respect rate limits
-                    await self._respect_rate_limit()
-                    
-                    # Create prompt for ML model
-                    prompt = self._create_scoring_prompt(job, criteria)
-                    base_score = await self._get_job_score(prompt)
+                # Boost score based on skills match
+                skills_boost = 0.0
+                if user_skills and job.description:
+                    matched_skills = _match_skills(user_skills, found_terms)
                     
-                    # Boost score based on skills match
-                    skills_boost = 0.0
-                    if user_skills and job.description:
-                        matched_skills = self.extract_skills_from_description(job.description, user_skills)
+                    if matched_skills and user_skills:
+                        match_percentage = len(matched_skills) / len(user_skills)
+                        skills_boost = min(0.3, match_percentage * 0.3)
                         
-                        if matched_skills and user_skills:
-                            match_percentage = len(matched_skills) / len(user_skills)
-                            skills_boost = min(0.3, match_percentage * 0.3)
-                            
-                            #job.matched_skills = matched_skills
-                    
-                    #job.relevance_score = min(1.0, base_score + skills_boost)
-                    self.score_cache[cache_key] = job.relevance_score
+                        #job.matched_skills = matched_skills
                 
-                scored_jobs.append(job)
+                #job.relevance_score = min(1.0, base_score + skills_boost)
+                cache_key = (job.job_title, job.company, criteria.position)
+                self.score_cache[cache_key] = job.relevance_score
                     
             except Exception as e:
                 logger.error(f"Error scoring job {job.job_title}: {str(e)}")
                 # Default to zero score on error
                 job.relevance_score = 0
-                scored_jobs.append(job)
+        
+        scored_jobs = [job for job, _, _ in jobs_to_score]
         
         # Give remaining jobs a basic score without using ML model
-        for job in remaining_jobs:
+        for job, _, found_terms in remaining_jobs:
             base_score = 0.3  # Basic score for jobs not evaluated by ML
             
             # Boost score based on skills match
             skills_boost = 0.0
             if user_skills and job.description:
-                matched_skills = self.extract_skills_from_description(job.description, user_skills)
+                matched_skills = _match_skills(user_skills, found_terms)
                 if matched_skills and user_skills:
                     match_percentage = len(matched_skills) / len(user_skills)
                     skills_boost = min(0.2, match_percentage * 0.2)
@@ -333,10 +502,15 @@ class JobRelevanceFilter:
             #job.relevance_score = min(0.5, base_score + skills_boost)
             scored_jobs.append(job)
         
+        # Record how many skills the user asked for, so the output can report a match percentage
+        if user_skills:
+            for job in scored_jobs:
+                job.total_user_skills = len(user_skills)
+        
         # Sort jobs by relevance score in descending order
         return sorted(scored_jobs, key=lambda x: x.relevance_score if x.relevance_score is not None else 0, reverse=True)
     
-    def _prefilter_jobs(self, jobs: List[JobResult], criteria: JobSearchRequest) -> List[JobResult]:
+    def _prefilter_jobs(self, jobs: List[JobResult], criteria: JobSearchRequest, user_skills: Optional[Tuple[str, ...]] = None, skill_automaton: Optional[ahocorasick.Automaton] = None) -> List[Tuple[JobResult, int, Set[str]]]:
         """
         Prefilter jobs to prioritize most promising candidates before ML scoring.
         Uses simple heuristics to assign preliminary scores.
@@ -344,52 +518,64 @@ class JobRelevanceFilter:
         Args:
             jobs: List of JobResult objects to filter
             criteria: User's job search criteria
+            user_skills: Normalized skills from _parse_user_skills (parsed from criteria if omitted)
+            skill_automaton: Skill automaton from _get_skill_automaton (looked up on demand if omitted)
             
         Returns:
-            List of JobResult objects sorted by preliminary score
+            List of (job, preliminary score, skill terms found in the description) tuples,
+            sorted by preliminary score
         """
-        job_scores = []
+        if user_skills is None:
+            user_skills = _parse_user_skills(criteria.skills)
+        if skill_automaton is None:
+            skill_automaton = self._get_skill_automaton(user_skills)
         
-        # Extract user skills
-        user_skills = []
-        if criteria.skills:
-            user_skills = [skill.strip() for skill in criteria.skills.lower().split(',')]
+        # Lowercase the search criteria once instead of once per job
+        position_lower = criteria.position.lower()
+        location_lower = criteria.location.lower() if criteria.location else None
+        many_skills_threshold = len(user_skills) / 2
         
-        for job in jobs:
+        def score_job(job: JobResult) -> Tuple[JobResult, int, Set[str]]:
             score = 0
+            found_terms: Set[str] = set()
+            # Lowercase the title once per job instead of once per skill
+            title_lower = job.job_title.lower()
+            
             # Boost score if job title contains position
-            if criteria.position.lower() in job.job_title.lower():
+            if position_lower in title_lower:
                 score += 5
             
             # Check for skills in job description
             if user_skills and job.description:
-                description_lower = job.description.lower()
+                # Lowercase and scan the description once for every skill
+                found_terms = _find_skill_terms(skill_automaton, job.description.lower())
                 skills_found = 0
                 
                 for skill in user_skills:
-                    skill_lower = skill.lower()
-                    if skill_lower in description_lower:
+                    if skill in found_terms:
                         skills_found += 1
                         
                         # Extra points if skill is in job title
-                        if skill_lower in job.job_title.lower():
+                        if skill in title_lower:
                             score += 2
                         else:
                             score += 1
                 
                 # Bonus for having many required skills
-                if skills_found > len(user_skills) / 2:
+                if skills_found > many_skills_threshold:
                     score += 2
             
             # Boost score if location matches
-            if criteria.location and job.location:
-                if criteria.location.lower() in job.location.lower():
+            if location_lower and job.location:
+                if location_lower in job.location.lower():
                     score += 2
             
-            job_scores.append((job, score))
+            return job, score, found_terms
         
-        # Sort by score and return jobs only
-        return [job for job, _ in sorted(job_scores, key=lambda x: x[1], reverse=True)]
+        # Score each job once, then sort by score
+        prioritized_jobs = [score_job(job) for job in jobs]
+        prioritized_jobs.sort(key=lambda scored: scored[1], reverse=True)
+        return prioritized_jobs
     
     async def _process_job_batch(self, jobs: List[JobResult], criteria: JobSearchRequest) -> List[JobResult]:
         """
@@ -406,7 +592,7 @@ class JobRelevanceFilter:
         
         for job in jobs:
             # Check cache first
-            cache_key = f"{job.job_title}_{job.company}_{criteria.position}"
+            cache_key = (job.job_title, job.company, criteria.position)
             if cache_key in self.score_cache:
                 job.relevance_score = self.score_cache[cache_key]
                 scored_jobs.append(job)
@@ -418,7 +604,7 @@ class JobRelevanceFilter:
                 
                 # Create prompt and get score from ML model
                 prompt = self._create_scoring_prompt(job, criteria)
-                score = await self._get_job_score(prompt)
+                score = await self._get_shared_job_score(cache_key, prompt)
                 
                 job.relevance_score = score
                 self.score_cache[cache_key] = score
@@ -435,18 +621,24 @@ class JobRelevanceFilter:
     async def _respect_rate_limit(self):
         """
         Implement rate limiting to avoid API throttling.
-        Adds delay between API calls if they occur too quickly.
+        Takes a token from the bucket, waiting only if the bucket is empty.
         """
-        current_time = time.time()
-        time_since_last_call = current_time - self.last_api_call
-        
-        if time_since_last_call < self.min_delay:
-            # Add random jitter to avoid synchronized requests
-            delay = self.min_delay - time_since_last_call + random.uniform(0.1, 0.5)
-            logger.info(f"Rate limiting: Waiting {delay:.2f} seconds before next API call")
-            await asyncio.sleep(delay)
+        delay = await self._scoring_bucket.acquire()
+        if delay:
+            logger.info(f"Rate limiting: Waited {delay:.2f} seconds before next API call")
+    
+    async def _wait_for_host(self, url: str):
+        """
+        Rate limit scraping per host so job sites aren't hit with bursts of requests.
         
-        self.last_api_call = time.time()
+        Args:
+            url: URL about to be fetched
+        """
+        host = urlsplit(url).hostname or ""
+        bucket = self._host_buckets.get(host)
+        if bucket is None:
+            bucket = self._host_buckets[host] = TokenBucket(capacity=3, refill_rate=1.0)
+        await bucket.acquire()
     
     def _create_scoring_prompt(self, job: JobResult, criteria: JobSearchRequest) -> str:
         """
@@ -459,70 +651,34 @@ class JobRelevanceFilter:
         Returns:
             Formatted prompt string for ML model
         """
-        # Extract job information
-        job_info = {
-            "title": job.job_title,
-            "company": job.company,
-            "location": job.location if job.location else "Not specified",
-            "job_type": job.jobNature if job.jobNature else "Not specified",
-            "salary": job.salary if job.salary else "Not specified",
-            "experience": job.experience if job.experience else "Not specified",
-            "description": job.description if job.description else "Not available"
-        }
-        
-        # Extract user criteria
-        user_criteria = {
-            "position": criteria.position,
-            "location": criteria.location if criteria.location else "Not specified",
-            "job_type": criteria.jobNature if criteria.jobNature else "Not specified",
-            "salary": criteria.salary if criteria.salary else "Not specified",
-            "experience": criteria.experience if criteria.experience else "Not specified",
-            "skills": criteria.skills if criteria.skills else "Not specified"
-        }
-        
-        # Use abbreviated description to avoid token limits
-        description_preview = job_info["description"][:500] if job_info["description"] else "Not available"
-        
-        # Format prompt template with job and user info
-        prompt = """
-        Score job relevance (0.0-1.0):
-        
-        Job: {title} at {company}
-        Location: {location}
-        Type: {job_type}
-        Salary: {salary}
-        Experience: {experience}
-        
-        User wants:
-        Position: {position}
-        Location: {user_location}
-        Type: {user_job_type}
-        Salary: {user_salary}
-        Experience: {user_experience}
-        Skills: {user_skills}
-        
-        Job description excerpt: {description}...
-        
-        Pay special attention to skills match. If the required skills match the user's skills, give higher score.
-        
-        Return only: {{"score": 0.XX}}
-        """.format(
-            title=job_info["title"],
-            company=job_info["company"],
-            location=job_info["location"],
-            job_type=job_info["job_type"],
-            salary=job_info["salary"],
-            experience=job_info["experience"],
-            description=description_preview,
-            position=user_criteria["position"],
-            user_location=user_criteria["location"],
-            user_job_type=user_criteria["job_type"],
-            user_salary=user_criteria["salary"],
-            user_experience=user_criteria["experience"],
-            user_skills=user_criteria["skills"]
-        )
-        
-        return prompt
+        # Keep the prompt compact: no indentation, unspecified fields are left out
+        # and only a short description excerpt is included, since every prompt
+        # token costs model time
+        job_fields = "; ".join(f"{label}: {value}" for label, value in (
+            ("Location", job.location),
+            ("Type", job.jobNature),
+            ("Salary", job.salary),
+            ("Experience", job.experience),
+        ) if value)
+        user_fields = "; ".join(f"{label}: {value}" for label, value in (
+            ("Position", criteria.position),
+            ("Location", criteria.location),
+            ("Type", criteria.jobNature),
+            ("Salary", criteria.salary),
+            ("Experience", criteria.experience),
+            ("Skills", criteria.skills),
+        ) if value)
+        
+        lines = [
+            "Score job relevance (0.0-1.0). Skills match matters most.",
+            f"Job: {job.job_title} at {job.company}" + (f"; {job_fields}" if job_fields else ""),
+            f"User wants: {user_fields}",
+        ]
+        if job.description:
+            lines.append(f"Description: {job.description[:PROMPT_DESCRIPTION_CHARS]}")
+        lines.append('Return only: {"score": 0.XX}')
+        
+        return "\n".join(lines)
     
     async def _get_job_score(self, prompt: str) -> float:
         """
@@ -538,21 +694,35 @@ class JobRelevanceFilter:
             # Call ML model API
             response = await self._call_huggingface_api(prompt)
 
-            try:
-                # Try to parse JSON response
-                result = json.loads(response)
-                return float(result.get("score", 0.0))
-            except (json.JSONDecodeError, AttributeError, TypeError):
-                # Fall back to regex for non-JSON responses
-                match = re.search(r"(\d+\.\d+)", response)
-                if match:
-                    return float(match.group(1))
-                return 0.0
+            # Read the "score" field directly, no need to build a full JSON parse
+            match = _SCORE_FIELD_RE.search(response)
+            if match:
+                return float(match.group(1))
+            
+            # Fall back to regex for non-JSON responses
+            match = _SCORE_RE.search(response)
+            if match:
+                return float(match.group(1))
+            return 0.0
         except Exception as e:
             logger.error(f"Error getting job score: {str(e)}")
             return 0.0
 
     
+    async def _get_shared_job_score(self, cache_key: Tuple[str, str, str], prompt: str) -> float:
+        """
+        Get job relevance score, sharing a single ML call between concurrent
+        callers that are scoring the same job.
+        
+        Args:
+            cache_key: Score cache key identifying the job and search position
+            prompt: Formatted prompt string for ML model
+            
+        Returns:
+            Float score between 0 and 1 indicating job relevance
+        """
+        return await run_single_flight(self._inflight_scores, cache_key, lambda: self._get_job_score(prompt))
+    
     async def _call_huggingface_api(self, prompt: str) -> str:
         """
         Call Hugging Face API to get job relevance score.
@@ -565,13 +735,16 @@ class JobRelevanceFilter:
             Raw response string from ML model
         """
         async def make_huggingface_request():
-            # Run in thread to avoid blocking event loop
-            return await asyncio.to_thread(
-                self.client.text_generation,
-                prompt,
-                model="google/flan-t5-base",  # Use Flan-T5 base model
-                max_new_tokens=50,  # Limit response length
-                temperature=0.2  # Low temperature for more consistent outputs
+            # Run on the dedicated worker threads to avoid blocking event loop
+            return await asyncio.get_running_loop().run_in_executor(
+                self._hf_executor,
+                partial(
+                    self.client.text_generation,
+                    prompt,
+                    model="google/flan-t5-base",  # Use Flan-T5 base model
+                    max_new_tokens=50,  # Limit response length
+                    temperature=0.2  # Low temperature for more consistent outputs
+                )
             )
         
         try:
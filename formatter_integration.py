@@ -1,5 +1,5 @@
 # formatter_integration.py
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 from models import JobResult
 
@@ -7,94 +7,84 @@ class JobSearchOutputResponse(BaseModel):
     """Final response format for the API"""
     relevant_jobs: List[JobResult]
 
-def format_job_results(jobs: List[Any]) -> Dict[str, List[Dict[str, Any]]]:
+# Public output fields, in the order JobResult declares them
+_OUTPUT_FIELDS = ("job_title", "company", "location", "jobNature", "experience", "apply_link", "salary")
+# Include-set for model_dump, built once instead of computing exclusions per job
+_OUTPUT_INCLUDE = frozenset(_OUTPUT_FIELDS)
+
+def _skills_match(matched_skills: Dict[str, float], total_skills: Optional[int]) -> Dict[str, Any]:
+    """Summarize matched skills against the number of skills the user asked for"""
+    skills_match = {"matched_skills": list(matched_skills.keys())}
+    # Without the user's skill count there's nothing meaningful to divide by
+    if total_skills:
+        skills_match["match_percentage"] = f"{(len(matched_skills) / total_skills) * 100:.0f}%"
+    return skills_match
+
+def _format_salary(min_salary: Optional[str], max_salary: Optional[str], median_salary: Optional[str]) -> Optional[str]:
+    """Format a display salary from the estimated salary fields, preferring the median"""
+    # The estimated salary fields are stored as strings, so convert before formatting
+    if median_salary:
+        return f"Median: ${float(median_salary):,.2f}"
+    if min_salary and max_salary:
+        return f"${float(min_salary):,.2f} - ${float(max_salary):,.2f}"
+    if min_salary:
+        return f"From ${float(min_salary):,.2f}"
+    if max_salary:
+        return f"Up to ${float(max_salary):,.2f}"
+    return None
+
+def format_job_results(jobs: List[Any], total_user_skills: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
     """
     Format job results to match the required output format.
     
     Args:
         jobs: List of job objects (either JobResult instances or dictionaries)
+        total_user_skills: Number of skills the user searched with, used for the match percentage
+            (read from each job if omitted)
         
     Returns:
         Dict containing standardized job output
     """
-    # Convert jobs to standardized format
+    # Convert jobs to standardized format, building the output dicts directly
+    # instead of validating a JobResult per job only to dump it again
     formatted_jobs = []
     
     for job in jobs:
         # Handle both dictionary and object inputs
         if isinstance(job, dict):
             # If job is a dictionary
-            job_data = JobResult(
-                job_title=job.get("job_title"),
-                company=job.get("company"),
-                experience=job.get("experience"),
-                jobNature=job.get("jobNature"),
-                location=job.get("location"),
-                salary=job.get("salary"),
-                apply_link=job.get("apply_link"),
-            )
-            
-            # Add skills match data if available
-            if job.get("matched_skills"):
-                job_data.skills_match = {
-                    "matched_skills": list(job.get("matched_skills").keys()),
-                    "match_percentage": f"{len(job.get('matched_skills')) / len(job.get('matched_skills')) * 100:.0f}%"
-                }
+            job_data = {field: job.get(field) for field in _OUTPUT_FIELDS}
+            matched_skills = job.get("matched_skills")
+            total_skills = total_user_skills or job.get("total_user_skills")
         else:
             # If job is an object with attributes
-            job_data = JobResult(
-                job_title=job.job_title,
-                company=job.company,
-                experience=job.experience,
-                jobNature=job.jobNature,
-                location=job.location,
-                salary=job.salary,
-                apply_link=job.apply_link,
-            )
-            
-            # Add skills match data if available
-            if hasattr(job, "matched_skills") and job.matched_skills:
-                job_data.skills_match = {
-                    "matched_skills": list(job.matched_skills.keys()),
-                    "match_percentage": f"{len(job.matched_skills) / len(job.matched_skills) * 100:.0f}%"
-                }
+            job_data = {field: getattr(job, field, None) for field in _OUTPUT_FIELDS}
+            matched_skills = getattr(job, "matched_skills", None)
+            total_skills = total_user_skills or getattr(job, "total_user_skills", None)
+        
+        # Add skills match data if available
+        if matched_skills:
+            job_data["skills_match"] = _skills_match(matched_skills, total_skills)
         
         formatted_jobs.append(job_data)
     
-    # Create the final response object
-    response = JobSearchOutputResponse(relevant_jobs=formatted_jobs)
-    
-    # Convert to dictionary (will exclude fields with exclude=True)
-    return response.dict()
+    return {"relevant_jobs": formatted_jobs}
 
 def prepare_final_output(jobs: List[JobResult]) -> Dict[str, List[Dict[str, Any]]]:
     """Format job results for API response"""
     output_jobs = []
     
     for job in jobs:
-        # Process base job data including salary formatting
-        if not job.salary:
-            if job.median_salary:
-                job.salary = f"Median: ${job.median_salary:,.2f}"
-            elif job.min_salary and job.max_salary:
-                job.salary = f"${job.min_salary:,.2f} - ${job.max_salary:,.2f}"
-            elif job.min_salary:
-                job.salary = f"From ${job.min_salary:,.2f}"
-            elif job.max_salary:
-                job.salary = f"Up to ${job.max_salary:,.2f}"
+        # Fill in a display salary only when the job has none but has estimates
+        if not job.salary and (job.median_salary or job.min_salary or job.max_salary):
+            job.salary = _format_salary(job.min_salary, job.max_salary, job.median_salary)
         
-        # Convert to dict and exclude internal fields
-        job_dict = job.model_dump(exclude_none=True, exclude_unset=True, exclude={'description', 'source', 'job_id', 'relevance_score'})
+        # Convert to dict with only the public output fields
+        job_dict = job.model_dump(include=_OUTPUT_INCLUDE, exclude_none=True, exclude_unset=True)
         
         # Add matched skills if available
         if hasattr(job, "matched_skills") and job.matched_skills:
-            skills_count = len(job.matched_skills.keys())
-            total_skills = getattr(job, "total_user_skills", skills_count)  
-            
-            job_dict["skills_match"] = {
-                "matched_skills": list(job.matched_skills.keys()),
-                "match_percentage": f"{(skills_count / total_skills) * 100:.0f}%" if total_skills > 0 else "0%"
-            }
+            job_dict["skills_match"] = _skills_match(job.matched_skills, job.total_user_skills)
         
         output_jobs.append(job_dict)
     
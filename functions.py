@@ -1,15 +1,93 @@
 # Helper function to convert API experience format to user-friendly format
+import asyncio
 import logging
 import os
 import re
 import httpx
-from typing import Tuple, Optional
-from rate_limiter import RateLimiter
+from typing import Dict, Tuple, Optional
+from cachetools import TTLCache
+import orjson
+from rate_limiter import RATE_LIMITER
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-rate_limiter = RateLimiter()
+rate_limiter = RATE_LIMITER
+
+# Realistic user agent to avoid getting blocked when scraping job sites
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+# Shared HTTP client so repeated API calls reuse pooled keep-alive connections
+_http_client: Optional[httpx.AsyncClient] = None
+# Per-API semaphores bounding concurrent requests to each API across all callers
+_api_semaphores: Dict[str, asyncio.Semaphore] = {}
+# Maximum concurrent requests to each API
+MAX_CONCURRENT_API_REQUESTS = 16
+# The event loop the client and semaphores above were created on
+_state_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def _bind_to_running_loop() -> None:
+    """
+    Drop the shared client and semaphores if they were created on a different event loop
+    (e.g. a previous asyncio.run), since they can't be used from this one.
+    """
+    global _state_loop, _http_client
+    loop = asyncio.get_running_loop()
+    if loop is not _state_loop:
+        _state_loop = loop
+        _http_client = None
+        _api_semaphores.clear()
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client for the running event loop, creating it on first use"""
+    global _http_client
+    _bind_to_running_loop()
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=20)
+        )
+    return _http_client
+
+def get_api_semaphore(api_name: str) -> asyncio.Semaphore:
+    """Return the semaphore bounding concurrent requests to an API for the running event loop"""
+    _bind_to_running_loop()
+    if api_name not in _api_semaphores:
+        _api_semaphores[api_name] = asyncio.Semaphore(MAX_CONCURRENT_API_REQUESTS)
+    return _api_semaphores[api_name]
+
+async def close_http_client():
+    """Close the shared HTTP client, if it was ever created"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+# Estimated salaries keyed by normalized (job title, location, experience); salary
+# estimates change slowly, so repeated searches can skip the rate-limited API for an hour
+_estimated_salary_cache = TTLCache(maxsize=512, ttl=3600)
+
+# Precompiled patterns used when parsing experience and salary strings
+_YEARS_RE = re.compile(r'(\d+)')
+# Salary range entered by the user, such as "$3000 - $5000"
+_USER_SALARY_RE = re.compile(r'\$?(\d+(?:,\d+)?)\s*-\s*\$?(\d+(?:,\d+)?)')
+# Format: "55,020.16–64,729.60 a year" or "$55,020.16 - $64,729.60 per year"
+_SALARY_RANGE_RE = re.compile(r'[$]?([0-9,\.]+)[\s]*[-–][\s]*[$]?([0-9,\.]+)[\s]*(per|a|an|\/)?[\s]*(year|month|hour|yr|wk|week|day|annual)?')
+# Format: "$55,020.16 a year" or "55,020.16 per year"
+_SALARY_SINGLE_RE = re.compile(r'[$]?([0-9,\.]+)[\s]*(per|a|an|\/)?[\s]*(year|month|hour|yr|wk|week|day|annual)?')
+
+# Multipliers to convert a salary for each period captured by the salary patterns
+# to its annual equivalent
+_PERIOD_MULT = {
+    "hour": 40 * 52,  # 40 hours/week, 52 weeks/year
+    "day": 5 * 52,  # 5 days/week, 52 weeks/year
+    "week": 52,
+    "wk": 52,
+    "month": 12,
+    "year": 1,
+    "yr": 1,
+    "annual": 1,
+}
 
 def format_experience(experience_code):
     """Convert API experience code to user-friendly format"""
@@ -33,7 +111,7 @@ def map_experience_to_requirements(experience_str):
         return "ALL", None
         
     # Extract numbers from the experience string
-    years_match = re.search(r'(\d+)', experience_str)
+    years_match = _YEARS_RE.search(experience_str)
     years = int(years_match.group(1)) if years_match else None
     
     # Handle various formats and convert to API parameters
@@ -67,6 +145,12 @@ def map_experience_to_requirements(experience_str):
     # Default to ALL if no clear mapping
     return "ALL", None
 
+def is_truthy(value) -> bool:
+    """Read a JSearch boolean flag, which may arrive as a bool or as a "true"/"false" string"""
+    if isinstance(value, str):
+        return value.lower() == "true"
+    return bool(value)
+
 async def get_estimated_salary(job_title, location, years_experience):
     """Get estimated salary for a job title in a location with specified experience"""
     api_key = os.environ.get("JSEARCH_API_KEY")
@@ -74,6 +158,13 @@ async def get_estimated_salary(job_title, location, years_experience):
         logger.warning("JSearch API key not found. Cannot get estimated salary.")
         return None
         
+    # Serve repeated lookups from the cache (only when the query is fully specified)
+    cache_key = None
+    if job_title and location:
+        cache_key = (job_title.strip().lower(), location.strip().lower(), years_experience)
+        if cache_key in _estimated_salary_cache:
+            return _estimated_salary_cache[cache_key]
+    
     try:
         url = "https://jsearch.p.rapidapi.com/estimated-salary"
         querystring = {
@@ -89,35 +180,52 @@ async def get_estimated_salary(job_title, location, years_experience):
         }
         
         async def make_request():
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, headers=headers, params=querystring, timeout=30.0)
-                
-                if response.status_code != 200:
-                    logger.error(f"Estimated salary API returned status code {response.status_code}")
-                    if response.status_code == 429:
-                        raise httpx.HTTPStatusError(f"Rate limit exceeded: {response.status_code}", request=response.request, response=response)
-                    return None
-                
-                data = response.json()
-                # Extract and return the salary information
-                if "data" in data and data["data"]:
-                    salary_data = data["data"][0]
-                    return {
-                        "min_salary": salary_data.get("min_salary"),
-                        "max_salary": salary_data.get("max_salary"),
-                        "median_salary": salary_data.get("median_salary"),
-                        "years_of_experience": years_experience,
-                        "salary_currency": salary_data.get("salary_currency", "USD")
-                    }
+            async with get_api_semaphore("jsearch"):
+                response = await get_http_client().get(url, headers=headers, params=querystring, timeout=30.0)
+            
+            if response.status_code != 200:
+                logger.error(f"Estimated salary API returned status code {response.status_code}")
+                if response.status_code == 429:
+                    raise httpx.HTTPStatusError(f"Rate limit exceeded: {response.status_code}", request=response.request, response=response)
                 return None
+            
+            data = orjson.loads(response.content)
+            # Extract and return the salary information
+            if "data" in data and data["data"]:
+                salary_data = data["data"][0]
+                return {
+                    "min_salary": salary_data.get("min_salary"),
+                    "max_salary": salary_data.get("max_salary"),
+                    "median_salary": salary_data.get("median_salary"),
+                    "years_of_experience": years_experience,
+                    "salary_currency": salary_data.get("salary_currency", "USD")
+                }
+            return None
+        
+        # Use the rate limiter for the API call; concurrent lookups for the same
+        # query (e.g. from the LinkedIn and Indeed scrapers) share one request
+        estimated_salary = await rate_limiter.execute_with_retry("jsearch", make_request, dedupe_key=cache_key and ("estimated-salary", cache_key))
         
-        # Use the rate limiter for the API call
-        return await rate_limiter.execute_with_retry("jsearch", make_request)
+        # Only cache real answers, so failed lookups are retried next time
+        if cache_key and estimated_salary:
+            _estimated_salary_cache[cache_key] = estimated_salary
+        return estimated_salary
             
     except Exception as e:
         logger.error(f"Error getting estimated salary: {str(e)}")
         return None
     
+def parse_user_salary(salary: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Parse the salary range from a search request, such as "$3000 - $5000".
+    Returns a tuple of (min_salary, max_salary), or (None, None) if there is no range.
+    """
+    if salary:
+        match = _USER_SALARY_RE.search(salary)
+        if match:
+            return int(match.group(1).replace(',', '')), int(match.group(2).replace(',', ''))
+    return None, None
+
 def parse_salary_range(salary_string: str) -> Tuple[Optional[float], Optional[float], Optional[str]]:
     """
     Parse a salary string like "55,020.16–64,729.60 a year" into min, max, and period.
@@ -128,8 +236,7 @@ def parse_salary_range(salary_string: str) -> Tuple[Optional[float], Optional[fl
     
     # Handle various salary formats
     # Format: "55,020.16–64,729.60 a year" or "$55,020.16 - $64,729.60 per year"
-    pattern = r'[$]?([0-9,\.]+)[\s]*[-–][\s]*[$]?([0-9,\.]+)[\s]*(per|a|an|\/)?[\s]*(year|month|hour|yr|wk|week|day|annual)?'
-    match = re.search(pattern, salary_string)
+    match = _SALARY_RANGE_RE.search(salary_string)
     
     if match:
         # Extract the min and max salaries
@@ -142,8 +249,7 @@ def parse_salary_range(salary_string: str) -> Tuple[Optional[float], Optional[fl
         return min_salary, max_salary, period
     else:
         # Format: "$55,020.16 a year" or "55,020.16 per year"
-        pattern = r'[$]?([0-9,\.]+)[\s]*(per|a|an|\/)?[\s]*(year|month|hour|yr|wk|week|day|annual)?'
-        match = re.search(pattern, salary_string)
+        match = _SALARY_SINGLE_RE.search(salary_string)
         
         if match:
             salary = float(match.group(1).replace(',', ''))
@@ -159,17 +265,8 @@ def normalize_annual_salary(salary: float, period: str) -> float:
     if not period:
         return salary
     
-    period = period.lower()
-    if 'hour' in period:
-        return salary * 40 * 52  # 40 hours/week, 52 weeks/year
-    elif 'day' in period:
-        return salary * 5 * 52  # 5 days/week, 52 weeks/year
-    elif 'week' in period or 'wk' in period:
-        return salary * 52  # 52 weeks/year
-    elif 'month' in period:
-        return salary * 12  # 12 months/year
-    else:  # 'year', 'annual', 'yr'
-        return salary
+    # Unknown periods are treated as annual
+    return salary * _PERIOD_MULT.get(period.lower(), 1)
 
 def is_salary_in_range(job_salary: str, user_min: float, user_max: float) -> bool:
     """
@@ -1,13 +1,14 @@
 # googlejobs_scraper.py
+import asyncio
 from typing import List
 import httpx
 import logging
 import os
+import orjson
 from dotenv import load_dotenv
-from functions import is_salary_in_range
+from functions import get_api_semaphore, get_http_client, is_salary_in_range, parse_user_salary
 from models import JobResult, JobSearchRequest
-from rate_limiter import RateLimiter
-import re
+from rate_limiter import RATE_LIMITER
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -15,17 +16,24 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Read the API key once at import; there is deliberately no built-in default key
+JOBS_API_KEY = os.environ.get("JOBS_API_KEY")
+if not JOBS_API_KEY:
+    logger.warning("Jobs API key not found. Set the JOBS_API_KEY environment variable.")
+
 class GoogleJobsAPIScraper:
     """API-based scraper for Google Jobs using Jobs API v14"""
     
     def __init__(self):
-        self.api_key = os.environ.get("JOBS_API_KEY", "798b712dd9mshde9f384c5a5b7cfp1eb940jsnab6dc7258b30")
+        self.api_key = JOBS_API_KEY
         self.api_host = "jobs-api14.p.rapidapi.com"
         
-        if not self.api_key:
-            logger.warning("Jobs API key not found. Using default key.")
-        
-        self.rate_limiter = RateLimiter()
+        # Shared limiter, so creating a scraper per request doesn't reset the budget
+        self.rate_limiter = RATE_LIMITER
+
+    async def search_many(self, params_list: List[JobSearchRequest], limit: int = 5) -> List[List[JobResult]]:
+        """Run several searches concurrently, returning one result list per search"""
+        return await asyncio.gather(*(self.search(params, limit=limit) for params in params_list))
 
     async def search(self, params: JobSearchRequest, limit: int = 5) -> List[JobResult]:
         logger.info(f"Searching Google Jobs via Jobs API v14 (limit: {limit})")
@@ -37,17 +45,19 @@ class GoogleJobsAPIScraper:
             # Build search query
             query = params.position
             location = params.location or "United States"
+            # Already lowercased by the request model
+            requested_job_nature = params.jobNature
             
             url = "https://jobs-api14.p.rapidapi.com/v2/list"
             
             # Configure employment types
             employment_types = []
-            if params.jobNature:
+            if requested_job_nature:
                 job_type_map = {
                     "onsite": None,
                     "remote": None  # Handled separately
                 }
-                job_type = job_type_map.get(params.jobNature.lower())
+                job_type = job_type_map.get(requested_job_nature)
                 if job_type:
                     employment_types.append(job_type)
             
@@ -55,7 +65,7 @@ class GoogleJobsAPIScraper:
             if not employment_types:
                 employment_types = ["fulltime", "parttime", "intern", "contractor"]
             
-            remote_only = "true" if params.jobNature and params.jobNature.lower() == "remote" else "false"
+            remote_only = "true" if requested_job_nature == "remote" else "false"
             
             # Build query parameters
             querystring = {
@@ -72,24 +82,18 @@ class GoogleJobsAPIScraper:
             }
 
             # Parse user's salary range if provided
-            user_min_salary = None
-            user_max_salary = None
-            if params.salary:
-                salary_match = re.search(r'(\d+(?:,\d+)?)\s*-\s*(\d+(?:,\d+)?)', params.salary)
-                if salary_match:
-                    user_min_salary = float(salary_match.group(1).replace(',', ''))
-                    user_max_salary = float(salary_match.group(2).replace(',', ''))
-                   # logger.info(f"User salary range: {user_min_salary} - {user_max_salary}")
+            user_min_salary, user_max_salary = parse_user_salary(params.salary)
+            # logger.info(f"User salary range: {user_min_salary} - {user_max_salary}")
 
             async def make_googlejobs_request():
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    response = await client.get(url, headers=headers, params=querystring)
-                    if response.status_code != 200:
-                        logger.error(f"Jobs API v14 returned status code {response.status_code} for Google Jobs")
-                        if response.status_code == 429:
-                            raise httpx.HTTPStatusError(f"Rate limit exceeded: {response.status_code}", request=response.request, response=response)
-                        return {}
-                    return response.json()
+                async with get_api_semaphore("jobs_api"):
+                    response = await get_http_client().get(url, headers=headers, params=querystring, timeout=30.0)
+                if response.status_code != 200:
+                    logger.error(f"Jobs API v14 returned status code {response.status_code} for Google Jobs")
+                    if response.status_code == 429:
+                        raise httpx.HTTPStatusError(f"Rate limit exceeded: {response.status_code}", request=response.request, response=response)
+                    return {}
+                return orjson.loads(response.content)
             
             # Use the rate limiter for the API call
             data = await self.rate_limiter.execute_with_retry("jobs_api", make_googlejobs_request)
@@ -99,23 +103,26 @@ class GoogleJobsAPIScraper:
             for raw in data.get("jobs", []):
                 
                 try:
-                    # Prepare description - some APIs provide truncated descriptions
+                    # Read each field once
+                    title = raw.get("title", "")
+                    company = raw.get("company", "")
                     description = raw.get("description", "")
+                    salary_min = raw.get("salary_min")
+                    salary_max = raw.get("salary_max")
+                    
+                    # Prepare description - some APIs provide truncated descriptions
                     if isinstance(description, str) and len(description) > 10:
                         parsed_description = description
                     else:
-                        parsed_description = f"Position: {raw.get('title', '')}\nCompany: {raw.get('company', '')}"
+                        parsed_description = f"Position: {title}\nCompany: {company}"
                     
                     # Format salary information
-                    salary_info = ""
-                    if raw.get("salary_min") and raw.get("salary_max"):
-                        salary_info = f"{raw.get('salary_min')} - {raw.get('salary_max')} {raw.get('salary_currency', 'USD')}"
-                    elif raw.get("salary_min"):
-                        salary_info = f"{raw.get('salary_min')} {raw.get('salary_currency', 'USD')}"
-                    elif raw.get("salary"):
-                        salary_info = str(raw.get("salary"))
-                    elif raw.get("salaryRange"):
-                        salary_info = raw.get("salaryRange")
+                    if salary_min and salary_max:
+                        salary_info = f"{salary_min} - {salary_max} {raw.get('salary_currency', 'USD')}"
+                    elif salary_min:
+                        salary_info = f"{salary_min} {raw.get('salary_currency', 'USD')}"
+                    else:
+                        salary_info = str(raw.get("salary") or raw.get("salaryRange") or "")
                     
                     # Check if job salary is within user's requested range
                     if user_min_salary and user_max_salary and salary_info:
@@ -125,14 +132,14 @@ class GoogleJobsAPIScraper:
                     
                     # Format location
                     location = raw.get("location", "")
-                    if not location and raw.get("city") and raw.get("country"):
-                        location = f"{raw.get('city')}, {raw.get('country')}"
-                    
-                    # Determine job nature (remote/onsite) based on user request and job data
-                    requested_job_nature = params.jobNature.lower() if params.jobNature else None
+                    if not location:
+                        city = raw.get("city")
+                        country = raw.get("country")
+                        if city and country:
+                            location = f"{city}, {country}"
                     
                     # Check for remote indicators in title or description
-                    has_remote_indicators = "remote" in raw.get("title", "").lower() or "remote" in parsed_description.lower()[:200]
+                    has_remote_indicators = "remote" in title.lower() or "remote" in parsed_description[:200].lower()
                     
                     # Determine job nature
                     if requested_job_nature == "remote":
@@ -155,14 +162,12 @@ class GoogleJobsAPIScraper:
                     apply_link = raw.get("url", "")
                     if not apply_link:
                         # Fallback URL if the API doesn't provide one
-                        job_title = raw.get("title", "").replace(" ", "+")
-                        company = raw.get("company", "").replace(" ", "+")
-                        apply_link = f"https://www.google.com/search?q={job_title}+{company}+job"
+                        apply_link = f"https://www.google.com/search?q={title.replace(' ', '+')}+{company.replace(' ', '+')}+job"
                     
                     results.append(
                         JobResult(
-                            job_title=raw.get("title", ""),
-                            company=raw.get("company", ""),
+                            job_title=title,
+                            company=company,
                             location=location or "Not specified",
                             salary=salary_info,
                             jobNature=job_nature,
@@ -173,7 +178,9 @@ class GoogleJobsAPIScraper:
                             source="Google Jobs"
                         )
                     )
-                    pass
+                    # Stop parsing once we have enough jobs
+                    if len(results) >= limit:
+                        break
                 except Exception as e:
                     logger.error(f"Error parsing job data from Jobs API v14: {str(e)}")
 
@@ -1,19 +1,39 @@
 #indeed_scraper.py
 
-from urllib.parse import quote_plus
-from bs4 import BeautifulSoup
+import asyncio
+from urllib.parse import quote_plus, urlsplit
+from bs4 import BeautifulSoup, SoupStrainer
 import httpx
 import logging
 import os
+import orjson
 from typing import List
 from models import JobResult, JobSearchRequest
+from functions import USER_AGENT, format_experience, get_api_semaphore, get_estimated_salary, get_http_client, is_truthy, map_experience_to_requirements, parse_user_salary
 import re
-from rate_limiter import RateLimiter
+from rate_limiter import RATE_LIMITER
 
-rate_limiter = RateLimiter()
+rate_limiter = RATE_LIMITER
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Limits parsing to the job cards on a search results page
+JOB_CARD_STRAINER = SoupStrainer("div", attrs={"class": re.compile(r"(?:^|\s)job_seen_beacon(?:\s|$)")})
+
+# Indeed "jt" filter values for each job type
+JOB_TYPE_MAP = {
+    "full-time": "fulltime",
+    "part-time": "parttime",
+    "contract": "contract",
+    "temporary": "temporary",
+    "internship": "internship"
+}
+
+def _is_indeed_link(url: str) -> bool:
+    """Check the link's host, so tracking parameters or look-alike domains don't match"""
+    host = urlsplit(url).hostname or ""
+    return host == "indeed.com" or host.endswith(".indeed.com")
+
 class IndeedAPIScraper:
     """API-based scraper for Indeed jobs using JSearch API"""
     
@@ -22,6 +42,10 @@ class IndeedAPIScraper:
         if not self.api_key:
             logger.warning("JSearch API key not found. Set the JSEARCH_API_KEY environment variable.")
     
+    async def search_many(self, params_list: List[JobSearchRequest], limit: int = 5) -> List[List[JobResult]]:
+        """Run several searches concurrently, returning one result list per search"""
+        return await asyncio.gather(*(self.search(params, limit=limit) for params in params_list))
+    
     async def search(self, params: JobSearchRequest, limit: int = 5) -> List[JobResult]:
         logger.info(f"Searching Indeed jobs via JSearch API (limit: {limit})")
         
@@ -33,25 +57,13 @@ class IndeedAPIScraper:
             # Build search query
             query = params.position
             location = params.location if params.location else ""
-            from functions import map_experience_to_requirements
+            # Already lowercased by the request model
+            job_nature_lowercase = params.jobNature
             # Process experience requirements
             experience_code, years = map_experience_to_requirements(params.experience)
-            from functions import get_estimated_salary
-            # Get estimated salary information first
-            estimated_salary = None
-            if query and location:
-                estimated_salary = await get_estimated_salary(query, location, experience_code)
             
             # Extract salary range from params if available
-            min_salary_param = None
-            max_salary_param = None
-            
-            if params.salary:
-                # Extract min and max salary from string like "$3000 - $5000"
-                salary_match = re.search(r'\$?(\d+(?:,\d+)?)\s*-\s*\$?(\d+(?:,\d+)?)', params.salary)
-                if salary_match:
-                    min_salary_param = int(salary_match.group(1).replace(',', ''))
-                    max_salary_param = int(salary_match.group(2).replace(',', ''))
+            min_salary_param, max_salary_param = parse_user_salary(params.salary)
             
             # Build the job search query
             url = "https://jsearch.p.rapidapi.com/search"
@@ -68,8 +80,7 @@ class IndeedAPIScraper:
             if max_salary_param:
                 querystring["max_salary"] = max_salary_param
             
-            if params.jobNature:
-                job_nature_lowercase = params.jobNature.lower()
+            if job_nature_lowercase:
                 if job_nature_lowercase == "remote":
                     # Set multiple parameters to ensure we get remote jobs
                     querystring["work_from_home"] = "true"
@@ -90,101 +101,102 @@ class IndeedAPIScraper:
             #logger.info(f"JSearch API querystring: {querystring}")  
             
             async def make_indeed_request():
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(url, headers=headers, params=querystring, timeout=30.0)
-                    
-                    if response.status_code != 200:
-                        logger.error(f"JSearch API returned status code {response.status_code}")
-                        if response.status_code == 429:
-                            raise httpx.HTTPStatusError(f"Rate limit exceeded: {response.status_code}", request=response.request, response=response)
-                        return []
-                    
-                    return response.json()
+                async with get_api_semaphore("jsearch"):
+                    response = await get_http_client().get(url, headers=headers, params=querystring, timeout=30.0)
+                
+                if response.status_code != 200:
+                    logger.error(f"JSearch API returned status code {response.status_code}")
+                    if response.status_code == 429:
+                        raise httpx.HTTPStatusError(f"Rate limit exceeded: {response.status_code}", request=response.request, response=response)
+                    return []
+                
+                return orjson.loads(response.content)
             
             # Use the rate limiter for the API call
-            data = await rate_limiter.execute_with_retry("jsearch", make_indeed_request)
+            search_request = rate_limiter.execute_with_retry("jsearch", make_indeed_request)
+            
+            # The estimated salary is only needed when processing the results,
+            # so fetch it alongside the search instead of before it
+            if query and location:
+                estimated_salary, data = await asyncio.gather(
+                    get_estimated_salary(query, location, experience_code),
+                    search_request
+                )
+            else:
+                estimated_salary = None
+                data = await search_request
             
             # if "data" in data:
             #     logger.info(f"JSearch API returned {len(data['data'])} results")
             
+            # Experience and salary come from the estimate, so they're the same for every job
+            salary_info = None
+            experience_info = None
+            if estimated_salary:
+                experience_code = estimated_salary.get("years_of_experience")
+                experience_info = format_experience(experience_code) if experience_code else ""
+                
+                # Process salary information
+                if min_salary_param and max_salary_param:
+                    median_salary = estimated_salary.get("median_salary")
+                    if median_salary and min_salary_param <= median_salary <= max_salary_param:
+                        salary_currency = estimated_salary.get("salary_currency", "USD")  # Get currency from estimated_salary
+                        if salary_currency == "PKR":
+                            salary_info = f"{median_salary:,.2f} PKR"
+                        else:
+                            salary_info = f"${median_salary:,.2f}"
+            
             results = []
-            from functions import format_experience
             if "data" in data:
                 for job in data["data"]:
                     try:
-                        # Only include if the apply_link contains indeed.com
+                        # Only include if the apply_link is actually from Indeed (cheapest check first)
                         apply_link = job.get("job_apply_link", "") or job.get("job_google_link", "")
+                        if not _is_indeed_link(apply_link):
+                            continue
                         
-                        # Check if the job is actually from Indeed
-                        if "indeed.com" in apply_link:
-                            salary_info = None
-                            experience_info = None
-                            
-                            # Process experience information
-                            if estimated_salary:
-                                experience_code = estimated_salary.get("years_of_experience")
-                                experience_info = format_experience(experience_code) if experience_code else ""
-                                
-                                # Process salary information
-                                if min_salary_param and max_salary_param:
-                                    median_salary = estimated_salary.get("median_salary")
-                                    if median_salary and min_salary_param <= median_salary <= max_salary_param:
-                                        salary_currency = estimated_salary.get("salary_currency", "USD")  # Get currency from estimated_salary
-                                        if salary_currency == "PKR":
-                                            salary_info = f"{median_salary:,.2f} PKR"
-                                        else:
-                                            salary_info = f"${median_salary:,.2f}"
-                                        
-                            # Process job nature (remote/onsite)
-                            # First check if we requested remote jobs
-                            if params.jobNature and params.jobNature.lower() == "remote":
-                                job_nature = "remote"
-                            else:
-                                # Otherwise, check the job data
-                                is_remote = job.get("job_is_remote", False)
-                                work_from_home = job.get("work_from_home", False)
-                                
-                                # Convert string values to boolean if needed
-                                if isinstance(is_remote, str):
-                                    is_remote = is_remote.lower() == "true"
-                                if isinstance(work_from_home, str):
-                                    work_from_home = work_from_home.lower() == "true"
-                                
-                                job_nature = "remote" if (is_remote or work_from_home) else "onsite"
-                            
-                            # Look for remote keywords in job title or description
-                            job_title = job.get("job_title", "").lower()
-                            job_description = job.get("job_description", "").lower()
-                            
-                            if params.jobNature and params.jobNature.lower() == "remote":
-                                # If user requested remote jobs, force it to be remote
-                                job_nature = "remote"
-                            elif "remote" in job_title or "work from home" in job_title or "remote" in job_description[:500]:
-                                job_nature = "remote"
-                            
-                            # Build location string
-                            location_parts = []
-                            if job.get("job_city"):
-                                location_parts.append(job.get("job_city"))
-                            if job.get("job_state"):
-                                location_parts.append(job.get("job_state"))
-                            if not location_parts and job.get("job_country"):
-                                location_parts.append(job.get("job_country"))
-                            
-                            job_data = JobResult(
-                                job_title=job.get("job_title", ""),
-                                company=job.get("employer_name", ""),
-                                experience=experience_info or "",
-                                location=", ".join(location_parts) if location_parts else "",
-                                salary=salary_info,
-                                jobNature=job_nature,
-                                apply_link=apply_link,
+                        # Process job nature (remote/onsite)
+                        job_title = job.get("job_title", "")
+                        if job_nature_lowercase == "remote":
+                            # If user requested remote jobs, force it to be remote
+                            job_nature = "remote"
+                        else:
+                            # Otherwise, check the job data, then remote keywords in the title or description
+                            job_title_lower = job_title.lower()
+                            is_remote = (
+                                is_truthy(job.get("job_is_remote"))
+                                or is_truthy(job.get("work_from_home"))
+                                or "remote" in job_title_lower
+                                or "work from home" in job_title_lower
+                                or "remote" in (job.get("job_description") or "")[:500].lower()
                             )
-                            
-                            # Only add jobs that match the requested job nature
-                            if not params.jobNature or job_nature.lower() == params.jobNature.lower():
-                                results.append(job_data)
-                                
+                            job_nature = "remote" if is_remote else "onsite"
+                        
+                        # Only keep jobs that match the requested job nature, before building anything else
+                        if job_nature_lowercase and job_nature != job_nature_lowercase:
+                            continue
+                        
+                        # Build location string: "city, state", either one alone, or the country
+                        city = job.get("job_city")
+                        state = job.get("job_state")
+                        if city and state:
+                            job_location = f"{city}, {state}"
+                        else:
+                            job_location = city or state or job.get("job_country") or ""
+                        
+                        results.append(JobResult(
+                            job_title=job_title,
+                            company=job.get("employer_name", ""),
+                            experience=experience_info or "",
+                            location=job_location,
+                            salary=salary_info,
+                            jobNature=job_nature,
+                            apply_link=apply_link,
+                        ))
+                        # Stop parsing once we have enough jobs
+                        if len(results) >= limit:
+                            break
+                        
                     except Exception as e:
                         logger.error(f"Error parsing Indeed API job: {e}")
             
@@ -213,68 +225,59 @@ class IndeedFallbackScraper:
             
             # Add job type filter if available
             if params.jobNature:
-                job_type_map = {
-                    "full-time": "fulltime",
-                    "part-time": "parttime",
-                    "contract": "contract",
-                    "temporary": "temporary",
-                    "internship": "internship"
-                }
-                job_type = job_type_map.get(params.jobNature.lower())
+                job_type = JOB_TYPE_MAP.get(params.jobNature)
                 if job_type:
                     url += f"&jt={job_type}"
             
-            async with httpx.AsyncClient(follow_redirects=True) as client:
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-                }
-                response = await client.get(url, headers=headers, timeout=30.0)
-                
-                if response.status_code != 200:
-                    logger.error(f"Indeed returned status code {response.status_code}")
-                    return []
-                
-                soup = BeautifulSoup(response.text, "html.parser")
-                job_cards = soup.select("div.job_seen_beacon")
-                
-                results = []
-                for job in job_cards[:limit]:  # Limit the number of results
-                    try:
-                        title_elem = job.select_one("h2.jobTitle span[title]") or job.select_one("h2.jobTitle")
-                        company_elem = job.select_one("span.companyName")
-                        location_elem = job.select_one("div.companyLocation")
-                        
-                        # Get job link
-                        link = None
-                        job_id_elem = job.get("data-jk")
-                        if job_id_elem:
-                            link = f"https://www.indeed.com/viewjob?jk={job_id_elem}"
-                        
-                        # Get salary if available
-                        salary_elem = job.select_one("div.metadata.salary-snippet-container")
-                        salary = salary_elem.text.strip() if salary_elem else None
-                        
-                        # Get job type if available
-                        job_type_elem = job.select_one("div.attribute_snippet")
-                        job_type = job_type_elem.text.strip() if job_type_elem else None
-                        
-                        if title_elem and company_elem:
-                            job_data = JobResult(
-                                job_title=title_elem.text.strip(),
-                                company=company_elem.text.strip(),
-                                location=location_elem.text.strip() if location_elem else None,
-                                salary=salary,
-                                jobNature=job_type,
-                                apply_link=link if link else "https://www.indeed.com/",
-                                job_id=job_id_elem if job_id_elem else None,
-                                source="Indeed"
-                            )
-                            results.append(job_data)
-                    except Exception as e:
-                        logger.error(f"Error parsing Indeed job: {e}")
-                
-               # logger.info(f"Found {len(results)} jobs on Indeed")
-                return results
+            headers = {"User-Agent": USER_AGENT}
+            response = await get_http_client().get(url, headers=headers, timeout=30.0, follow_redirects=True)
+            
+            if response.status_code != 200:
+                logger.error(f"Indeed returned status code {response.status_code}")
+                return []
+            
+            # Only build the job cards from the page
+            soup = BeautifulSoup(response.text, "lxml", parse_only=JOB_CARD_STRAINER)
+            job_cards = soup.select("div.job_seen_beacon")
+            
+            results = []
+            for job in job_cards[:limit]:  # Limit the number of results
+                try:
+                    title_elem = job.select_one("h2.jobTitle span[title]") or job.select_one("h2.jobTitle")
+                    company_elem = job.select_one("span.companyName")
+                    location_elem = job.select_one("div.companyLocation")
+                    
+                    # Get job link
+                    link = None
+                    job_id_elem = job.get("data-jk")
+                    if job_id_elem:
+                        link = f"https://www.indeed.com/viewjob?jk={job_id_elem}"
+                    
+                    # Get salary if available
+                    salary_elem = job.select_one("div.metadata.salary-snippet-container")
+                    salary = salary_elem.text.strip() if salary_elem else None
+                    
+                    # Get job type if available
+                    job_type_elem = job.select_one("div.attribute_snippet")
+                    job_type = job_type_elem.text.strip() if job_type_elem else None
+                    
+                    if title_elem and company_elem:
+                        job_data = JobResult(
+                            job_title=title_elem.text.strip(),
+                            company=company_elem.text.strip(),
+                            location=location_elem.text.strip() if location_elem else None,
+                            salary=salary,
+                            jobNature=job_type,
+                            apply_link=link if link else "https://www.indeed.com/",
+                            job_id=job_id_elem if job_id_elem else None,
+                            source="Indeed"
+                        )
+                        results.append(job_data)
+                except Exception as e:
+                    logger.error(f"Error parsing Indeed job: {e}")
+            
+           # logger.info(f"Found {len(results)} jobs on Indeed")
+            return results
                 
         except Exception as e:
             logger.error(f"Error searching Indeed: {str(e)}")
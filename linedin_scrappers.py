@@ -1,19 +1,32 @@
 # Job scrapers
+import asyncio
 import logging
 import os
+import orjson
 import re
 from typing import List
 from urllib.parse import quote_plus
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import httpx
-from functions import format_experience, get_estimated_salary, map_experience_to_requirements
+import soupsieve
+from functions import USER_AGENT, format_experience, get_api_semaphore, get_estimated_salary, get_http_client, is_truthy, map_experience_to_requirements, parse_user_salary
 from models import JobResult, JobSearchRequest
-from rate_limiter import RateLimiter
+from rate_limiter import RATE_LIMITER
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-rate_limiter = RateLimiter()
+rate_limiter = RATE_LIMITER
+
+# Limits parsing to the job cards on a search results page
+JOB_CARD_STRAINER = SoupStrainer("div", attrs={"class": re.compile(r"(?:^|\s)base-card(?:\s|$)")})
+
+# CSS selectors for the job card fields, compiled once instead of on every card
+JOB_CARD_SELECTOR = soupsieve.compile("div.base-card")
+TITLE_SELECTOR = soupsieve.compile(".base-search-card__title")
+COMPANY_SELECTOR = soupsieve.compile(".base-search-card__subtitle")
+LOCATION_SELECTOR = soupsieve.compile(".job-search-card__location")
+LINK_SELECTOR = soupsieve.compile("a.base-card__full-link")
 
 class LinkedInAPIScraper:
     """API-based scraper for LinkedIn jobs using JSearch API"""
@@ -38,20 +51,8 @@ class LinkedInAPIScraper:
             # Process experience requirements
             experience_code, years = map_experience_to_requirements(params.experience)
             
-            # Get estimated salary information first - use rate limiter
-            estimated_salary = None
-            if query and location:
-                estimated_salary = await get_estimated_salary(query, location, experience_code)
-            
             # Extract salary range from params if available
-            min_salary_param = None
-            max_salary_param = None
-            
-            if params.salary:
-                salary_match = re.search(r'\$?(\d+(?:,\d+)?)\s*-\s*\$?(\d+(?:,\d+)?)', params.salary)
-                if salary_match:
-                    min_salary_param = int(salary_match.group(1).replace(',', ''))
-                    max_salary_param = int(salary_match.group(2).replace(',', ''))
+            min_salary_param, max_salary_param = parse_user_salary(params.salary)
             
             url = "https://jsearch.p.rapidapi.com/search"
             querystring = {
@@ -68,16 +69,10 @@ class LinkedInAPIScraper:
             if max_salary_param:
                 querystring["max_salary"] = max_salary_param
             
-            # Add job type filter if available
-            if params.jobNature:
-                job_type_map = {
-                    "remote": "remote",
-                    "onsite":"onsite"
-                }
-                job_type = job_type_map.get(params.jobNature.lower())
-                if params.jobNature and params.jobNature.lower() == "remote":
-                    querystring["remote_jobs_only"] = "true"  
-                    querystring["work_from_home"] = "true"
+            # Ask the API for remote jobs only if requested
+            if params.jobNature == "remote":
+                querystring["remote_jobs_only"] = "true"  
+                querystring["work_from_home"] = "true"
                 
             if experience_code:
                 querystring["years_of_experience"] = experience_code
@@ -88,19 +83,33 @@ class LinkedInAPIScraper:
             }
             
             async def make_linkedin_request():
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(url, headers=headers, params=querystring, timeout=30.0)
-                    
-                    if response.status_code != 200:
-                        logger.error(f"JSearch API returned status code {response.status_code} for LinkedIn jobs")
-                        if response.status_code == 429:
-                            raise httpx.HTTPStatusError(f"Rate limit exceeded: {response.status_code}", request=response.request, response=response)
-                        return []
-                    
-                    return response.json()
+                async with get_api_semaphore("jsearch"):
+                    response = await get_http_client().get(url, headers=headers, params=querystring, timeout=30.0)
+                
+                if response.status_code != 200:
+                    logger.error(f"JSearch API returned status code {response.status_code} for LinkedIn jobs")
+                    if response.status_code == 429:
+                        raise httpx.HTTPStatusError(f"Rate limit exceeded: {response.status_code}", request=response.request, response=response)
+                    return []
+                
+                return orjson.loads(response.content)
             
             # Use the rate limiter for the API call
-            data = await rate_limiter.execute_with_retry("jsearch", make_linkedin_request)
+            search_request = rate_limiter.execute_with_retry("jsearch", make_linkedin_request)
+            
+            # The estimated salary is only needed when processing the results,
+            # so fetch it alongside the search instead of before it
+            if query and location:
+                estimated_salary, data = await asyncio.gather(
+                    get_estimated_salary(query, location, experience_code),
+                    search_request
+                )
+            else:
+                estimated_salary = None
+                data = await search_request
+            
+            # Whether the user asked for remote jobs, decided once for the whole search
+            requested_remote = params.jobNature == "remote"
             
             results = []
             if "data" in data:
@@ -131,65 +140,95 @@ class LinkedInAPIScraper:
                                                 salary_info = f"${median_salary:,.2f}"
                                             
                                 # Process job nature (remote/onsite)
-                                # First check if we requested remote jobs
-                                if params.jobNature and params.jobNature.lower() == "remote":
+                                # If user requested remote jobs, force it to be remote
+                                if requested_remote:
                                     job_nature = "remote"
                                 else:
-                                    # Otherwise, check the job data
-                                    is_remote = job.get("job_is_remote", False)
-                                    work_from_home = job.get("work_from_home", False)
-                                    
-                                    # Convert string values to boolean if needed
-                                    if isinstance(is_remote, str):
-                                        is_remote = is_remote.lower() == "true"
-                                    if isinstance(work_from_home, str):
-                                        work_from_home = work_from_home.lower() == "true"
-                                    
-                                    job_nature = "remote" if (is_remote or work_from_home) else "onsite"
-                                
-                                # Look for remote keywords in job title or description
-                                job_title = job.get("job_title", "").lower()
-                                job_description = job.get("job_description", "").lower()
-                                
-                                if params.jobNature and params.jobNature.lower() == "remote":
-                                    # If user requested remote jobs, force it to be remote
-                                    job_nature = "remote"
-                                elif "remote" in job_title or "work from home" in job_title or "remote" in job_description[:500]:
-                                    job_nature = "remote"
+                                    # Otherwise, check the job data, then remote keywords in the title or description
+                                    job_title_lower = (job.get("job_title") or "").lower()
+                                    is_remote = (
+                                        is_truthy(job.get("job_is_remote"))
+                                        or is_truthy(job.get("work_from_home"))
+                                        or "remote" in job_title_lower
+                                        or "work from home" in job_title_lower
+                                        or "remote" in (job.get("job_description") or "")[:500].lower()
+                                    )
+                                    job_nature = "remote" if is_remote else "onsite"
                                 
-                                # Build location string
-                                location_parts = []
-                                if job.get("job_city"):
-                                    location_parts.append(job.get("job_city"))
-                                if job.get("job_state"):
-                                    location_parts.append(job.get("job_state"))
-                                if not location_parts and job.get("job_country"):
-                                    location_parts.append(job.get("job_country"))
+                                # Build location string: "city, state", either one alone, or the country
+                                city = job.get("job_city")
+                                state = job.get("job_state")
+                                if city and state:
+                                    job_location = f"{city}, {state}"
+                                else:
+                                    job_location = city or state or job.get("job_country") or ""
                                 
                                 job_data = JobResult(
                                     job_title=job.get("job_title", ""),
                                     company=job.get("employer_name", ""),
                                     experience=experience_info or "",
-                                    location=", ".join(location_parts) if location_parts else "",
+                                    location=job_location,
                                     salary=salary_info,
                                     jobNature=job_nature,
                                     apply_link=apply_link,
                                 )
                                 
                                 # Only add jobs that match the requested job nature
-                                if not params.jobNature or job_nature.lower() == params.jobNature.lower():
+                                if not params.jobNature or job_nature == params.jobNature:
                                     results.append(job_data)
+                                    # Stop parsing once we have enough jobs
+                                    if len(results) >= limit:
+                                        break
                                     
                         except Exception as e:
                             logger.error(f"Error parsing Indeed API job: {e}")
                 
                    # logger.info(f"Found {len(results)} matching jobs via JSearch API for LinkedIn")
-                    return results[:limit]
+                    return results
                 
         except Exception as e:
             logger.error(f"Error searching LinkedIn via API: {str(e)}")
             return []
         
+def _parse_job_cards(html: str, limit: int) -> List[JobResult]:
+    """
+    Parse job cards from a LinkedIn search results page.
+    
+    Args:
+        html: Search results page HTML
+        limit: Maximum number of job cards to parse
+        
+    Returns:
+        List of JobResult objects for the cards that have a title, company and link
+    """
+    # Only build the job cards from the page
+    soup = BeautifulSoup(html, "lxml", parse_only=JOB_CARD_STRAINER)
+    job_cards = JOB_CARD_SELECTOR.select(soup)
+    
+    results = []
+    for job in job_cards[:limit]:  # Limit the number of results
+        try:
+            title_elem = TITLE_SELECTOR.select_one(job)
+            company_elem = COMPANY_SELECTOR.select_one(job)
+            location_elem = LOCATION_SELECTOR.select_one(job)
+            link_elem = LINK_SELECTOR.select_one(job)
+            
+            if title_elem and company_elem and link_elem:
+                job_data = JobResult(
+                    job_title=title_elem.text.strip(),
+                    company=company_elem.text.strip(),
+                    location=location_elem.text.strip() if location_elem else None,
+                    apply_link=link_elem["href"],
+                    experience= "",
+                    jobNature="",
+                    salary=""
+                )
+                results.append(job_data)
+        except Exception as e:
+            logger.error(f"Error parsing LinkedIn job: {e}")
+    
+    return results
+
 class LinkedInFallbackScraper:
     """Fallback scraper for LinkedIn jobs using web scraping (used if API key not available)"""
     
@@ -207,46 +246,22 @@ class LinkedInFallbackScraper:
             url = f"https://www.linkedin.com/jobs/search/?keywords={encoded_query}"
             
             # Add filters if available
-            if params.jobNature and params.jobNature.lower() == "remote":
+            if params.jobNature == "remote":
                 url += "&f_WT=2"
             
-            async with httpx.AsyncClient(follow_redirects=True) as client:
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-                }
-                response = await client.get(url, headers=headers, timeout=30.0)
-                
-                if response.status_code != 200:
-                    logger.error(f"LinkedIn returned status code {response.status_code}")
-                    return []
-                
-                soup = BeautifulSoup(response.text, "html.parser")
-                job_cards = soup.select("div.base-card")
-                
-                results = []
-                for job in job_cards[:limit]:  # Limit the number of results
-                    try:
-                        title_elem = job.select_one(".base-search-card__title")
-                        company_elem = job.select_one(".base-search-card__subtitle")
-                        location_elem = job.select_one(".job-search-card__location")
-                        link_elem = job.select_one("a.base-card__full-link")
-                        
-                        if title_elem and company_elem and link_elem:
-                            job_data = JobResult(
-                                job_title=title_elem.text.strip(),
-                                company=company_elem.text.strip(),
-                                location=location_elem.text.strip() if location_elem else None,
-                                apply_link=link_elem["href"],
-                                experience= "",
-                                jobNature="",
-                                salary=""
-                            )
-                            results.append(job_data)
-                    except Exception as e:
-                        logger.error(f"Error parsing LinkedIn job: {e}")
-                
-              #  logger.info(f"Found {len(results)} jobs on LinkedIn")
-                return results
+            headers = {"User-Agent": USER_AGENT}
+            response = await get_http_client().get(url, headers=headers, timeout=30.0, follow_redirects=True)
+            
+            if response.status_code != 200:
+                logger.error(f"LinkedIn returned status code {response.status_code}")
+                return []
+            
+            # Parsing is CPU-bound, so run it in a worker thread to keep the event loop
+            # free for the other scrapers' responses
+            results = await asyncio.to_thread(_parse_job_cards, response.text, limit)
+            
+          #  logger.info(f"Found {len(results)} jobs on LinkedIn")
+            return results
                 
         except Exception as e:
             logger.error(f"Error searching LinkedIn: {str(e)}")
@@ -1,27 +1,57 @@
 #main.py
 # Import necessary libraries and modules
+import asyncio  # To run the scrapers concurrently
+from cachetools import TTLCache  # For caching responses to repeated searches
+from contextlib import asynccontextmanager  # For the application lifespan handler
 from fastapi import FastAPI, HTTPException, Query  # FastAPI framework for building the API
 import logging  # For logging information and errors
 from dotenv import load_dotenv  # To load environment variables from .env file
 from class_filter import JobRelevanceFilter  # Custom module for scoring job relevance
 from formatter_integration import prepare_final_output  # Module to format the final output
+from functions import close_http_client  # Shared HTTP client used by the helper functions
 # Import scrapers for different job platforms
 from indeed_scraper import IndeedAPIScraper, IndeedFallbackScraper  
 from linedin_scrappers import LinkedInAPIScraper, LinkedInFallbackScraper
 from models import JobSearchRequest  # Data model for job search requests
-from rate_limiter import RateLimiter  # Module to handle API rate limiting
+from rate_limiter import RATE_LIMITER  # Shared API rate limiter
 
 # Load environment variables from .env file
 load_dotenv()
-# Initialize rate limiter to prevent API rate limit errors
-rate_limiter = RateLimiter()
+# Rate limiter shared with the scrapers to prevent API rate limit errors
+rate_limiter = RATE_LIMITER
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Shared relevance filter, created on first use so its HTTP connections and score cache
+# are reused across requests
+shared_relevance_filter = None
+
+# Final responses for recent searches, keyed by the request payload and limit.
+# Identical searches within 15 minutes are answered without calling any API
+_response_cache = TTLCache(maxsize=512, ttl=900)
+
+def get_relevance_filter() -> JobRelevanceFilter:
+    """Return the shared JobRelevanceFilter, creating it on first use"""
+    global shared_relevance_filter
+    if shared_relevance_filter is None:
+        shared_relevance_filter = JobRelevanceFilter()
+    return shared_relevance_filter
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global shared_relevance_filter
+    yield
+    # Close shared HTTP connections on shutdown. The filter's client and semaphore
+    # belong to this event loop, so the next startup creates a fresh filter
+    if shared_relevance_filter is not None:
+        await shared_relevance_filter.aclose()
+        shared_relevance_filter = None
+    await close_http_client()
+
 # Initialize FastAPI application
-app = FastAPI(title="Job Search API", description="API for searching jobs across multiple platforms")
+app = FastAPI(title="Job Search API", description="API for searching jobs across multiple platforms", lifespan=lifespan)
 
 @app.post("/find-jobs")
 async def find_jobs(request: JobSearchRequest, limit: int = Query(default=3, ge=1, le=5)):
@@ -35,6 +65,13 @@ async def find_jobs(request: JobSearchRequest, limit: int = Query(default=3, ge=
     Returns:
     - Dictionary containing relevant jobs formatted according to requirements
     """
+    # Serve repeated searches from the cache
+    cache_key = (request.model_dump_json(), limit)
+    cached_output = _response_cache.get(cache_key)
+    if cached_output is not None:
+        logger.info("Returning cached results for repeated search")
+        return cached_output
+    
     try:
         # Initialize scrapers for different job platforms
         linkedin_api_scraper = LinkedInAPIScraper()
@@ -50,35 +87,45 @@ async def find_jobs(request: JobSearchRequest, limit: int = Query(default=3, ge=
         # This is higher than the final limit to ensure enough jobs for filtering
         scraper_limit = 5
         
-        # Get job results from LinkedIn API
-        linkedin_api_results = await linkedin_api_scraper.search(request, limit=scraper_limit)
-        
-        # If LinkedIn API returns no results, use fallback scraper (web scraping)
-        if not linkedin_api_results:
-            logger.info("No jobs found from LinkedIn API, using fallback scraper")
-            linkedin_fallback_results = await linkedin_fallback_scraper.search(request, limit=scraper_limit)
-            linkedin_results = linkedin_fallback_results
-        else:
-            linkedin_results = linkedin_api_results
+        async def search_linkedin():
+            # Get job results from LinkedIn API
+            linkedin_api_results = await linkedin_api_scraper.search(request, limit=scraper_limit)
+            
+            # If LinkedIn API returns no results, use fallback scraper (web scraping)
+            if not linkedin_api_results:
+                logger.info("No jobs found from LinkedIn API, using fallback scraper")
+                return await linkedin_fallback_scraper.search(request, limit=scraper_limit)
+            return linkedin_api_results
         
-        # Get job results from Indeed API
-        indeed_api_results = await indeed_scraper.search(request, limit=scraper_limit)
+        async def search_google_jobs():
+            # If Google Jobs scraper is available, fetch results
+            if google_jobs_scraper:
+                return await google_jobs_scraper.search(request, limit=scraper_limit)
+            return []
         
-        # Initialize empty list for Google Jobs results
-        google_jobs_results = []
-        # If Google Jobs scraper is available, fetch results
-        if google_jobs_scraper:
-            google_jobs_results = await google_jobs_scraper.search(request, limit=scraper_limit)
+        # Query all platforms concurrently; they're independent network calls
+        source_names = ("LinkedIn", "Indeed", "Google Jobs")
+        source_results = await asyncio.gather(
+            search_linkedin(),
+            indeed_scraper.search(request, limit=scraper_limit),
+            search_google_jobs(),
+            return_exceptions=True
+        )
         
-        # Combine results from all sources
-        all_jobs = linkedin_results + indeed_api_results + google_jobs_results
+        # Combine results from all sources, skipping any source that failed
+        all_jobs = []
+        for source_name, results in zip(source_names, source_results):
+            if isinstance(results, Exception):
+                logger.error(f"Error searching {source_name}: {str(results)}")
+                continue
+            all_jobs.extend(results)
         
         # If no jobs found across all platforms, return empty list
         if not all_jobs:
             return {"relevant_jobs": []}
         
-        # Initialize the JobRelevanceFilter to score and filter jobs
-        relevance_filter = JobRelevanceFilter()
+        # Get the shared JobRelevanceFilter to score and filter jobs
+        relevance_filter = get_relevance_filter()
         
         # Fetch detailed job descriptions for better relevance scoring
         # This will selectively fetch descriptions for a subset of jobs to avoid rate limiting
@@ -91,6 +138,10 @@ async def find_jobs(request: JobSearchRequest, limit: int = Query(default=3, ge=
         # Format the results according to the required output structure
         formatted_output = prepare_final_output(scored_jobs)
         
+        # Only cache searches that found jobs, so a temporary API failure isn't remembered
+        if formatted_output.get("relevant_jobs"):
+            _response_cache[cache_key] = formatted_output
+        
         # Return the formatted results
         return formatted_output
         
@@ -1,5 +1,5 @@
 # models.py
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional
 
 class JobSearchRequest(BaseModel):
@@ -10,6 +10,12 @@ class JobSearchRequest(BaseModel):
     experience: Optional[str] = None
     skills: Optional[str] = None
 
+    @field_validator("jobNature")
+    @classmethod
+    def normalize_job_nature(cls, value: Optional[str]) -> Optional[str]:
+        """Store the job nature lowercased once, so scrapers can compare it directly"""
+        return value.strip().lower() if value else value
+
 class JobResult(BaseModel):
     job_title: str
     company: str
@@ -26,4 +32,5 @@ class JobResult(BaseModel):
     source: Optional[str] = Field(default=None, exclude=True)  # Excluded from output
     job_id: Optional[str] = Field(default=None, exclude=True)  # Excluded from output
     relevance_score: Optional[float] = Field(default=None, exclude=True)  # Excluded from output
-    matched_skills: Optional[dict] = Field(default=None, exclude=True)  # Store matched skills with confidence scores
\ No newline at end of file
+    matched_skills: Optional[dict] = Field(default=None, exclude=True)  # Store matched skills with confidence scores
+    total_user_skills: Optional[int] = Field(default=None, exclude=True)  # Number of skills the user searched with
\ No newline at end of file
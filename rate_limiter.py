@@ -6,18 +6,109 @@ from typing import Dict, Any, Callable, Awaitable, Optional
 
 logger = logging.getLogger(__name__)
 
+async def run_single_flight(inflight: Dict[Any, asyncio.Future], key: Any, func: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Run func once for concurrent callers with the same key, sharing its result.
+    
+    Args:
+        inflight: Futures for the calls currently in progress, keyed by key
+        key: Identifies calls that can share a result
+        func: Makes the call when no other caller is already making it
+        
+    Returns:
+        The result of func, from this caller's call or the one already in progress
+    """
+    # Another caller is already making this call, so wait for its result. The shield
+    # keeps a cancelled waiter from cancelling the call for everyone else
+    existing = inflight.get(key)
+    if existing is not None:
+        return await asyncio.shield(existing)
+    
+    future = asyncio.get_running_loop().create_future()
+    inflight[key] = future
+    try:
+        result = await func()
+    except asyncio.CancelledError:
+        # Fail the waiters with a regular exception; they weren't cancelled themselves
+        future.set_exception(RuntimeError("Shared call was cancelled"))
+        future.exception()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Mark the exception as retrieved in case nobody else was waiting
+        future.exception()
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        del inflight[key]
+
+class TokenBucket:
+    """
+    A single token bucket. Callers take a token immediately while one is
+    available; otherwise they reserve the next token and sleep until it accrues.
+    """
+    
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate  # tokens per second
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+        # Guards the token count; belongs to an event loop, so it's created on first use in each loop
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def _get_lock(self) -> asyncio.Lock:
+        """Return the bucket's lock for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+        return self._lock
+    
+    def _refill(self) -> None:
+        """Refill tokens based on time elapsed since last refill"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.refill_rate)
+        self.last_refill = now
+    
+    async def reserve(self) -> float:
+        """
+        Take one token without waiting for it.
+        Returns how long the caller must wait before using it (0 if it was available).
+        """
+        async with self._get_lock():
+            self._refill()
+            
+            delay = 0.0
+            if self.tokens < 1:
+                # Wait just long enough for one token to accrue
+                delay = (1 - self.tokens) / self.refill_rate
+            
+            # Reserve the token now (the balance may go negative), so concurrent
+            # callers queue up behind each other instead of all waking at once
+            self.tokens -= 1
+            return delay
+    
+    async def acquire(self) -> float:
+        """
+        Take one token, waiting only if the bucket is empty.
+        Returns the actual delay applied.
+        """
+        delay = await self.reserve()
+        if delay:
+            # Wait for the reserved token (without holding the lock)
+            await asyncio.sleep(delay)
+        return delay
+
 class RateLimiter:
     """
     An optimized rate limiter that minimizes delays while still respecting API limits.
-    Uses a token bucket approach for more efficient rate limiting.
+    Uses a token bucket per API for more efficient rate limiting.
     """
     
     def __init__(self):
-        # Track available tokens for each API
-        self.tokens: Dict[str, float] = {}
-        # Track last refill time
-        self.last_refill: Dict[str, float] = {}
-        
         # Define rate limits (requests per minute)
         self.rate_limits = {
             "jsearch": 5,      # 5 requests per minute for JSearch API
@@ -26,26 +117,23 @@ class RateLimiter:
             "default": 30      # Default limit for unspecified APIs
         }
         
-        # Initialize token buckets for each API
-        for api, limit in self.rate_limits.items():
-            self.tokens[api] = limit
-            self.last_refill[api] = time.time()
-    
-    def _refill_tokens(self, api_name: str) -> None:
-        """Refill tokens based on time elapsed since last refill"""
-        now = time.time()
-        api = api_name if api_name in self.rate_limits else "default"
-        
-        # Get time elapsed since last refill
-        elapsed = now - self.last_refill.get(api, now)
-        
-        # Calculate new tokens to add (tokens accrue at rate of limit per minute)
-        rate = self.rate_limits[api] / 60.0  # tokens per second
-        new_tokens = elapsed * rate
+        # Initialize token buckets for each API (tokens accrue at the limit per minute)
+        self._buckets: Dict[str, TokenBucket] = {
+            api: TokenBucket(capacity=limit, refill_rate=limit / 60.0)
+            for api, limit in self.rate_limits.items()
+        }
         
-        # Update token count (never exceed the maximum)
-        self.tokens[api] = min(self.tokens.get(api, 0) + new_tokens, self.rate_limits[api])
-        self.last_refill[api] = now
+        # Calls currently in progress, keyed by the caller's dedupe key.
+        # They belong to an event loop, so they're reset when the loop changes
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: Dict[Any, asyncio.Future] = {}
+    
+    def _bind_to_running_loop(self) -> None:
+        """Drop the in-flight calls if the running event loop has changed"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._inflight = {}
     
     async def wait_for_rate_limit(self, api_name: str) -> float:
         """
@@ -54,19 +142,11 @@ class RateLimiter:
         """
         api = api_name if api_name in self.rate_limits else "default"
         
-        # Refill tokens based on elapsed time
-        self._refill_tokens(api)
-        
-        # If we have tokens available, use one immediately
-        if self.tokens.get(api, 0) >= 1:
-            self.tokens[api] -= 1
+        # If a token is available it's used immediately
+        delay = await self._buckets[api].reserve()
+        if not delay:
             return 0
         
-        # Calculate minimum delay needed to get a token
-        tokens_needed = 1
-        rate = self.rate_limits[api] / 60.0  # tokens per second
-        delay = tokens_needed / rate
-        
         # Apply minimal jitter only when we're close to the limit
         jitter = random.uniform(0, 0.1)  # Add up to 100ms of jitter
         
@@ -74,16 +154,36 @@ class RateLimiter:
         if delay > 0.1:
             logger.info(f"Rate limiting {api_name}: Waiting {delay:.2f}s before next request")
         
-        # Wait for the calculated time
+        # Wait for the reserved token
         await asyncio.sleep(delay + jitter)
         
-        # Consume the token we waited for
-        self._refill_tokens(api)
-        self.tokens[api] -= 1
-        
         return delay + jitter
     
     async def execute_with_retry(
+        self, 
+        api_name: str,
+        func: Callable[..., Awaitable[Any]], 
+        *args, 
+        max_retries: int = 3, 
+        retry_status_codes: Optional[list] = None,
+        dedupe_key: Any = None,
+        **kwargs
+    ) -> Any:
+        """
+        Execute a function with efficient retry logic.
+        Concurrent calls with the same dedupe_key share a single execution.
+        """
+        if dedupe_key is None:
+            return await self._execute_with_retry(api_name, func, *args, max_retries=max_retries, retry_status_codes=retry_status_codes, **kwargs)
+        
+        self._bind_to_running_loop()
+        return await run_single_flight(
+            self._inflight,
+            dedupe_key,
+            lambda: self._execute_with_retry(api_name, func, *args, max_retries=max_retries, retry_status_codes=retry_status_codes, **kwargs)
+        )
+    
+    async def _execute_with_retry(
         self, 
         api_name: str,
         func: Callable[..., Awaitable[Any]], 
@@ -92,7 +192,7 @@ class RateLimiter:
         retry_status_codes: Optional[list] = None,
         **kwargs
     ) -> Any:
-        """Execute a function with efficient retry logic"""
+        """Call func, waiting for the rate limit before each attempt and retrying on failure"""
         if retry_status_codes is None:
             retry_status_codes = [429, 500, 502, 503, 504]
         
@@ -136,8 +236,9 @@ class RateLimiter:
                     if retry_after and retry_after.isdigit():
                         delay = float(retry_after) + 0.1  # Slight buffer
                     else:
-                        # Progressive backoff for rate limits
-                        delay = min(2 * (attempt + 1), 30)  # Cap at 30 seconds
+                        # Exponential backoff with jitter so concurrent callers
+                        # that were throttled together don't retry in lockstep
+                        delay = min(2 ** (attempt + 1), 30) + random.uniform(0, 0.5)  # Cap at ~30 seconds
                 else:
                     # Short delays for other errors
                     delay = 0.5 * (attempt + 1)  # 0.5s, 1.0s, 1.5s
@@ -152,4 +253,7 @@ class RateLimiter:
                 await asyncio.sleep(delay)
         
         # This should never be reached due to the raise in the loop
-        raise last_exception if last_exception else RuntimeError("Unknown error in execute_with_retry")
\ No newline at end of file
+        raise last_exception if last_exception else RuntimeError("Unknown error in execute_with_retry")
+
+# Shared rate limiter, so every scraper instance throttles against the same budget
+RATE_LIMITER = RateLimiter()